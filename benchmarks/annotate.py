@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark annotating plasmids from a feature library: compiling the library,
+loading it as a worker would and scanning molecules with the automaton,
+against searching for each pattern in turn with str.find.
+
+Usage: python benchmarks/annotate.py [--features N] [--molecules N]
+"""
+from __future__ import division
+
+import argparse
+import io
+import random
+import time
+
+from dgparse import annotate
+from dgparse import sequtils
+
+
+def random_bases(rand, length):
+    return ''.join(rand.choice('ACGT') for _ in range(length))
+
+
+def find_each(features, bases):
+    """Every pattern on both strands, one str.find scan at a time"""
+    hits = 0
+    for feature in features:
+        pattern = feature['pattern']['bases']
+        for query in set([pattern, sequtils.get_reverse_complement(pattern)]):
+            position = bases.find(query)
+            while position >= 0:
+                hits += 1
+                position = bases.find(query, position + 1)
+    return hits
+
+
+def timed(label, func, count=1):
+    started = time.time()
+    result = func()
+    elapsed = time.time() - started
+    print '{0:<16} {1:8.3f} s {2:10,.0f} /s'.format(
+        label, elapsed, count / elapsed)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--features', type=int, default=500)
+    parser.add_argument('--molecules', type=int, default=1000)
+    parser.add_argument('--length', type=int, default=8000)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    features = [{'name': str(index), 'category': 'misc_feature',
+                 'pattern': {'bases': random_bases(rand, rand.randint(20, 1000))}}
+                for index in range(args.features)]
+    molecules = []
+    for _ in range(args.molecules):
+        parts = [random_bases(rand, args.length // 2)]
+        parts.extend(rand.choice(features)['pattern']['bases']
+                     for _ in range(3))
+        molecules.append(''.join(parts))
+    annotator = timed('compile', lambda: annotate.Annotator(features))
+    buf = io.BytesIO()
+    annotator.dump(buf)
+    buf.seek(0)
+    annotator = timed('load', lambda: annotate.Annotator.load(buf))
+    print '{0:,} states, {1:,} bytes saved'.format(
+        len(annotator.outputs), len(buf.getvalue()))
+    found = timed('automaton', lambda: sum(
+        len(annotator.annotate(bases)) for bases in molecules),
+        len(molecules))
+    assert found == timed('str.find', lambda: sum(
+        find_each(features, bases) for bases in molecules), len(molecules))
+
+
+if __name__ == '__main__':
+    main()
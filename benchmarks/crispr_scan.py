@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark enumerating the CRISPR guides of a random circular genome with
+each nuclease: finding the targets with array masks, then building the
+GuideRnaCut dicts.
+
+Usage: python benchmarks/crispr_scan.py [--megabases N]
+"""
+from __future__ import division
+
+import argparse
+import random
+import time
+
+from dgparse import crispr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabases', type=int, default=5)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    block = ''.join(rand.choice('ACGT') for _ in range(10 ** 6))
+    bases = block * args.megabases
+    print '{0:,} bases'.format(len(bases))
+    for nuclease in (crispr.SPCAS9, crispr.SACAS9, crispr.CAS12A):
+        started = time.time()
+        targets = crispr.find_targets(bases, nuclease, is_circular=True)
+        found = time.time() - started
+        guides = crispr.find_guides(bases, nuclease, is_circular=True,
+                                    pause_gc=True)
+        elapsed = time.time() - started - found
+        assert len(guides) == sum(len(starts) for starts, _ in targets)
+        print '{0:<8} {1:9,} guides {2:6.2f} s targets {3:6.2f} s guides'.format(
+            nuclease.name, len(guides), found, elapsed)
+
+
+if __name__ == '__main__':
+    main()
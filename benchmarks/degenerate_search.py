@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark searching plasmids for degenerate motifs: one Shift-And scan for
+all the motifs on both strands against a regex alternation of their
+expansions, as compiled outside the library before.
+
+Usage: python benchmarks/degenerate_search.py [--molecules N]
+"""
+from __future__ import division
+
+import argparse
+import random
+import re
+import time
+
+from dgparse import search
+from dgparse import sequtils
+
+MOTIFS = ['GAATTC', 'GGTCTC', 'CGTCTC', 'GCNGC', 'CCTNAGG', 'RGATCY',
+          'GGNCC', 'CCWGG', 'GCCNNNNNGGC', 'NGG']
+
+IUPAC_CLASSES = dict((code, '[{0}]'.format(''.join(bases)))
+                     for code, bases in sequtils.AMBIGUOUS_CODES.iteritems())
+
+
+def motif_regex(motifs):
+    """An overlapping regex for the motifs and their reverse complements"""
+    expanded = set()
+    for motif in motifs:
+        for strand in (motif, sequtils.get_reverse_complement(motif)):
+            expanded.add(''.join(IUPAC_CLASSES.get(code, code)
+                                 for code in strand))
+    return re.compile('(?=({0}))'.format('|'.join(sorted(expanded))))
+
+
+def timed(label, func, count):
+    started = time.time()
+    result = func()
+    elapsed = time.time() - started
+    print '{0:<16} {1:8.3f} s {2:10,.0f} molecules/s'.format(
+        label, elapsed, count / elapsed)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--molecules', type=int, default=200)
+    parser.add_argument('--length', type=int, default=8000)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    molecules = [''.join(rand.choice('ACGT') for _ in range(args.length))
+                 for _ in range(args.molecules)]
+    regex = motif_regex(MOTIFS)
+    timed('regex', lambda: sum(len(regex.findall(bases))
+                               for bases in molecules), len(molecules))
+    for mismatches in (0, 1):
+        matcher = search.Matcher(MOTIFS[:-1], mismatches)
+        timed('shift-and k={0}'.format(mismatches), lambda: sum(
+            1 for bases in molecules for _ in matcher.find(bases)),
+            len(molecules))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark parsing a large oligo pool fasta file serially and in parallel.
+
+Usage: python benchmarks/fasta_parallel.py [--records N] [--workers N ...]
+"""
+from __future__ import division
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from dgparse.fasta.parallel import iter_fasta_parallel
+from dgparse.fasta.parse_fasta import iter_fasta
+
+
+def write_oligo_pool(path, n_records, seed=0):
+    """Write n_records short records, each a 60 to 120 base oligo"""
+    rand = random.Random(seed)
+    oligos = [''.join(rand.choice('ACGT') for _ in range(120))
+              for _ in range(1000)]
+    with open(path, 'wb') as out:
+        for number in range(n_records):
+            oligo = oligos[number % len(oligos)][:60 + number % 61]
+            out.write('>oligo{0} linear\n{1}\n'.format(number, oligo))
+
+
+def run(label, records, count):
+    started = time.time()
+    parsed = sum(1 for _ in records)
+    elapsed = time.time() - started
+    assert parsed == count, (parsed, count)
+    print '{0:<16} {1:8.2f} s {2:12,.0f} records/s'.format(
+        label, elapsed, count / elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=10 ** 6)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.fasta')
+    os.close(handle)
+    try:
+        write_oligo_pool(path, args.records)
+        print '{0:,} records, {1:,} bytes, {2} cpus'.format(
+            args.records, os.path.getsize(path), os.sysconf('SC_NPROCESSORS_ONLN'))
+        with open(path, 'rb') as fasta_file:
+            run('iter_fasta', iter_fasta(fasta_file), args.records)
+        for workers in args.workers:
+            run('{0} workers'.format(workers),
+                iter_fasta_parallel(path, workers), args.records)
+            run('{0} unordered'.format(workers),
+                iter_fasta_parallel(path, workers, ordered=False), args.records)
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
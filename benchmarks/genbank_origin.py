@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark decoding of a chromosome sized GenBank ORIGIN section. The time
+per megabase should stay flat as the section grows.
+
+Usage: python benchmarks/genbank_origin.py [--bases N]
+"""
+from __future__ import division
+
+import argparse
+import random
+import time
+
+from dgparse.genbank.origin import parse_origin_lines
+
+
+def origin_lines(n_bases, seed=0):
+    """Build the numbered 60 base lines of an ORIGIN section"""
+    rand = random.Random(seed)
+    block = ''.join(rand.choice('acgt') for _ in range(6000))
+    bases = (block * (n_bases // len(block) + 1))[:n_bases]
+    lines = []
+    for offset in range(0, n_bases, 60):
+        row = bases[offset:offset + 60]
+        groups = ' '.join(row[i:i + 10] for i in range(0, len(row), 10))
+        lines.append('{0:>9} {1}\n'.format(offset + 1, groups))
+    lines.append('//\n')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bases', type=int, default=5 * 10 ** 6)
+    args = parser.parse_args()
+
+    for divisor in (8, 4, 2, 1):
+        n_bases = args.bases // divisor
+        lines = iter(origin_lines(n_bases))
+        out = {'origin': ''}
+        started = time.time()
+        parse_origin_lines(next(lines), lines, out)
+        elapsed = time.time() - started
+        assert len(out['origin']) == n_bases
+        print '{0:>12,} bases {1:8.3f} s {2:8.3f} s/Mb'.format(
+            n_bases, elapsed, elapsed / n_bases * 10 ** 6)
+
+
+if __name__ == '__main__':
+    main()
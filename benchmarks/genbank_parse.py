@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark the GenBank parser on a large synthetic record.
+
+Usage: python benchmarks/genbank_parse.py [--bases N] [--features N]
+"""
+from __future__ import division
+
+import argparse
+import functools
+import io
+import random
+import time
+
+from dgparse import genbank
+from dgparse.genbank import main as genbank_main
+
+
+def synthetic_genbank(n_bases, n_features, seed=0):
+    """Build a single GenBank record of n_bases with n_features annotations"""
+    rand = random.Random(seed)
+    lines = [
+        'LOCUS       synthetic {0} bp    DNA     circular SYN 01-JAN-2016'.format(n_bases),
+        'FEATURES             Location/Qualifiers',
+    ]
+    for number in range(n_features):
+        start = rand.randint(1, n_bases - 1000)
+        end = start + rand.randint(20, 999)
+        location = '{0}..{1}'.format(start, end)
+        if number % 2:
+            location = 'complement({0})'.format(location)
+        lines.append('     misc_feature    {0}'.format(location))
+        lines.append('                     /label="feature {0}"'.format(number))
+        lines.append('                     /note="synthetic annotation"')
+    lines.append('ORIGIN')
+    bases = ''.join(rand.choice('acgt') for _ in range(1000))
+    bases = (bases * (n_bases // 1000 + 1))[:n_bases]
+    for offset in range(0, n_bases, 60):
+        row = bases[offset:offset + 60]
+        groups = ' '.join(row[i:i + 10] for i in range(0, len(row), 10))
+        lines.append('{0:>9} {1}'.format(offset + 1, groups))
+    lines.append('//')
+    return '\n'.join(lines) + '\n'
+
+
+def run(label, func, payload, line_count):
+    started = time.time()
+    func(io.BytesIO(payload))
+    elapsed = time.time() - started
+    print '{0:<16} {1:8.2f} s {2:12,.0f} lines/s'.format(
+        label, elapsed, line_count / elapsed)
+
+
+def run_convert(label, payload, n_features, lazy, read=None):
+    """Time converting one parsed record, then reading from its features"""
+    result = genbank_main.init(io.BytesIO(payload))
+    started = time.time()
+    record = genbank.convert(result, lazy)
+    converted = time.time() - started
+    if read is not None:
+        for feature in record['dnafeatures']:
+            read(feature)
+    elapsed = time.time() - started
+    print '{0:<16} {1:8.2f} s {2:8.2f} us/feature'.format(
+        label, elapsed, (elapsed if read else converted) * 1e6 / n_features)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bases', type=int, default=10 * 10 ** 6)
+    parser.add_argument('--features', type=int, default=20000)
+    args = parser.parse_args()
+
+    payload = synthetic_genbank(args.bases, args.features)
+    line_count = payload.count('\n')
+    print '{0:,} bases, {1:,} features, {2:,} lines'.format(
+        args.bases, args.features, line_count)
+    run('main.init', genbank_main.init, payload, line_count)
+    run('genbank.parse', genbank.parse, payload, line_count)
+    run('lazy parse', functools.partial(genbank.parse, lazy=True),
+        payload, line_count)
+    name = lambda feature: feature['dnafeature']['name']
+    bases = lambda feature: feature['dnafeature']['pattern']['bases']
+    for lazy in (False, True):
+        mode = 'lazy' if lazy else 'eager'
+        run_convert(mode + ' convert', payload, args.features, lazy)
+        run_convert(mode + ' names', payload, args.features, lazy, name)
+        run_convert(mode + ' patterns', payload, args.features, lazy, bases)
+    run('LOCUS only', functools.partial(genbank.parse, sections=['LOCUS']),
+        payload, line_count)
+    run('no ORIGIN', functools.partial(genbank.parse,
+                                       sections=['LOCUS', 'FEATURES']),
+        payload, line_count)
+
+
+if __name__ == '__main__':
+    main()
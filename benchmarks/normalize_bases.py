@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark cleaning and validating joined FASTA lines: the replace, upper and
+regex search chain against sequtils.normalize_bases.
+
+Usage: python benchmarks/normalize_bases.py [--megabases N]
+"""
+from __future__ import division
+
+import argparse
+import random
+import time
+
+from dgparse import sequtils
+
+
+def synthetic_lines(n_bases, width=60, seed=0):
+    """Mixed case bases in CRLF terminated lines, as joined by the parser"""
+    rand = random.Random(seed)
+    block = ''.join(rand.choice('ACGTacgtN') for _ in range(width * 1000))
+    bases = (block * (n_bases // len(block) + 1))[:n_bases]
+    return '\r\n'.join(bases[i:i + width] for i in range(0, n_bases, width))
+
+
+def replace_chain(joined):
+    seqstr = unicode(joined.replace(" ", "").replace("\r", "").replace(
+        "\n", "").upper())
+    return seqstr, sequtils.NOT_DNA.search(seqstr)
+
+
+def translate_once(joined):
+    bases, illegal = sequtils.normalize_bases(joined, " \r\n")
+    return unicode(bases), illegal
+
+
+def run(label, func, payload, n_bases):
+    started = time.time()
+    func(payload)
+    elapsed = time.time() - started
+    print '{0:<16} {1:8.3f} s {2:10,.0f} Mb/s'.format(
+        label, elapsed, n_bases / elapsed / 10 ** 6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabases', type=int, default=100)
+    args = parser.parse_args()
+
+    n_bases = args.megabases * 10 ** 6
+    for label, payload in (('str', synthetic_lines(n_bases)),
+                           ('unicode', unicode(synthetic_lines(n_bases)))):
+        print '{0:,} bases as {1}'.format(n_bases, label)
+        assert replace_chain(payload)[0] == translate_once(payload)[0]
+        run('replace chain', replace_chain, payload, n_bases)
+        run('normalize_bases', translate_once, payload, n_bases)
+
+
+if __name__ == '__main__':
+    main()
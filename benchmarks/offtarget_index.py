@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark scoring a batch of SpCas9 guides against a random genome: building
+the seed index, saving it, then loading it memory mapped and finding the
+off-targets of each guide with up to 4 mismatches.
+
+Usage: python benchmarks/offtarget_index.py [--megabases N] [--guides N]
+"""
+from __future__ import division
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from dgparse import crispr
+from dgparse import offtarget
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabases', type=int, default=5)
+    parser.add_argument('--guides', type=int, default=1000)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    bases = ''.join(rand.choice('ACGT')
+                    for _ in range(args.megabases * 10 ** 6))
+    print '{0:,} bases'.format(len(bases))
+    started = time.time()
+    index = offtarget.OffTargetIndex.build([('genome', bases, True)])
+    print '{0:<16} {1:8.3f} s'.format('build', time.time() - started)
+
+    directory = tempfile.mkdtemp()
+    try:
+        started = time.time()
+        index.save(directory)
+        index = offtarget.OffTargetIndex.load(directory)
+        print '{0:<16} {1:8.3f} s'.format('save and load',
+                                          time.time() - started)
+        guides = crispr.find_guides(bases[:10 ** 5], crispr.SPCAS9)
+        guides = rand.sample(guides, min(args.guides, len(guides)))
+        started = time.time()
+        offtarget.score_guides(guides, index, molecule='genome')
+        elapsed = time.time() - started
+        hits = sum(len(guide['offtargets']) for guide in guides)
+        print '{0:<16} {1:8.3f} s {2:,} guides {3:,} off-targets'.format(
+            'score', elapsed, len(guides), hits)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
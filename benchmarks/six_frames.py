@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark the vectorized six frame translation and ORF finder against
+translating codon by codon with the TRANSLATE dict.
+
+Usage: python benchmarks/six_frames.py [--megabases N]
+"""
+from __future__ import division
+
+import argparse
+import random
+import time
+
+from dgparse import sequtils
+
+
+def synthetic_bases(n_bases, seed=0):
+    rand = random.Random(seed)
+    block = ''.join(rand.choice('ACGT') for _ in range(10 ** 6))
+    return (block * (n_bases // len(block) + 1))[:n_bases]
+
+
+def translate_dict(bases):
+    """All six frames one codon at a time"""
+    frames = {}
+    for strand, seq in ((1, bases), (-1, sequtils.rev_comp(bases))):
+        for frame in range(3):
+            frames[strand, frame] = ''.join(
+                sequtils.TRANSLATE.get(seq[i:i + 3], 'X')
+                for i in range(frame, len(seq) - 2, 3))
+    return frames
+
+
+def run(label, func, payload, n_bases):
+    started = time.time()
+    result = func(payload)
+    elapsed = time.time() - started
+    print '{0:<16} {1:8.3f} s {2:10,.1f} Mb/s'.format(
+        label, elapsed, n_bases / elapsed / 10 ** 6)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--megabases', type=int, default=10)
+    args = parser.parse_args()
+
+    n_bases = args.megabases * 10 ** 6
+    bases = synthetic_bases(n_bases)
+    print '{0:,} bases'.format(n_bases)
+    expected = run('dict lookups', translate_dict, bases, n_bases)
+    frames = run('six frames', sequtils.six_frame_translation, bases, n_bases)
+    assert frames == expected
+    orfs = run('linear ORFs', sequtils.find_orfs, bases, n_bases)
+    print '{0:,} ORFs'.format(len(orfs))
+    run('circular ORFs', lambda seq: sequtils.find_orfs(seq, True),
+        bases, n_bases)
+
+
+if __name__ == '__main__':
+    main()
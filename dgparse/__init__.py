@@ -21,6 +21,8 @@ from . import snapgene
 from . import excel
 from . import genbank
 from . import fasta
+from . import compression
+from . import restriction
 
 VALIDATORS = {
     'oligo': schema.DnaOligoSchema(),
@@ -40,6 +42,7 @@ PARSERS = {
     '.gb': genbank.parse,
     '.gbk': genbank.parse,
     '.genbank': genbank.parse,
+    '.seq': genbank.iter_genbank,  # flat-file release divisions
     '.fa': fasta.parse,
     '.fasta': fasta.parse,
     '.fas': fasta.parse,
@@ -69,20 +72,40 @@ def validate(record):
     return data, errors
 
 
-def load_iter(record_type, record_files):
-    """Load a file and return a single array of records"""
+def get_parser(record_path):
+    """
+    Returns the parser for a file by its extension, looking through any
+    compression extension, e.g. .gbk.gz is parsed as GenBank
+    """
+    format_ = compression.strip_extension(record_path)
+    try:
+        return PARSERS[format_]
+    except KeyError:
+        msg = "No parser for {0} files".format(format_ or record_path)
+        raise exc.NoParserException(msg)
+
+
+def load_iter(record_type, record_files, catalogue=None):
+    """
+    Load a file and return a single array of records. Given a
+    restriction.Catalogue, the restriction sites of each molecule are found
+    after parsing, see restriction.digest_record.
+    """
     record_schema = VALIDATORS[record_type]
+    load = record_schema.load
+    if catalogue is not None:
+        load = lambda item: record_schema.load(
+            restriction.digest_record(item, catalogue))
     for record_path in record_files:
-        format_ = os.path.splitext(record_path)[-1]
-        parser = PARSERS[format_]
-        with open(record_path, 'r') as record_file:
+        parser = get_parser(record_path)
+        with compression.open_file(record_path) as record_file:
             try:
                 raw_records = parser(record_file)
                 if isinstance(raw_records, dict):
-                    yield record_schema.load(raw_records)
+                    yield load(raw_records)
                 else:
                     for item in raw_records:
-                        yield record_schema.load(item)
+                        yield load(item)
             except exc.ParserException as exception:
                 LOG.error(exception)
                 raise exception
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Automatic annotation of molecules from a library of known features.
+
+The feature patterns, and their reverse complements, are compiled into one
+Aho-Corasick automaton over the bases ACGT, so a molecule is scanned once,
+whatever the size of the library, to find every exact occurrence on either
+strand. Any other character in the molecule, e.g. N, matches nothing.
+
+The automaton is stored as a full transition table, one row of five
+transitions per state (the fifth, for anything but ACGT, always returns to
+the root), so the scan is a single list lookup per base. A compiled
+Annotator pickles to a compact form and can be saved with dump() and loaded
+by each worker with load().
+"""
+from __future__ import absolute_import
+
+import array
+import collections
+import copy
+import cPickle
+import hashlib
+import logging
+
+from dgparse import sequtils
+
+log = logging.getLogger(__name__)
+
+# ACGT in either case to 0-3, anything else to 4
+ALPHABET = 5
+BASE_CODES = b''.join(chr(b'ACGT'.find(chr(char).upper()) % ALPHABET)
+                      for char in range(256))
+
+Match = collections.namedtuple('Match', 'start end strand feature')
+
+
+def make_feature(record):
+    """The dnafeature of a library record, as genbank.parse would give it"""
+    bases = str(record['pattern']['bases']).upper()
+    return {
+        'name': record.get('name'),
+        'category': record.get('category'),
+        'description': record.get('description'),
+        'properties': dict(record.get('properties') or {}),
+        'length': len(bases),
+        'pattern': {
+            'bases': bases,
+            'sha1': hashlib.sha1(bases).hexdigest(),
+        },
+    }
+
+
+def build_automaton(patterns):
+    """
+    Compile (bases, key) patterns into the transitions and outputs of an
+    Aho-Corasick automaton. State 0 is the root. outputs[state] is a tuple
+    of the (length, key) of every pattern ending at that state, or None.
+    """
+    goto = [{}]
+    outputs = [[]]
+    for bases, key in patterns:
+        state = 0
+        for code in bytearray(bases.translate(BASE_CODES)):
+            if code not in goto[state]:
+                goto[state][code] = len(goto)
+                goto.append({})
+                outputs.append([])
+            state = goto[state][code]
+        outputs[state].append((len(bases), key))
+    # breadth first, so the failure state of each is already complete
+    transitions = [0] * (len(goto) * ALPHABET)
+    failure = [0] * len(goto)
+    queue = collections.deque()
+    for code in range(ALPHABET - 1):
+        child = goto[0].get(code)
+        if child is not None:
+            transitions[code] = child
+            queue.append(child)
+    while queue:
+        state = queue.popleft()
+        outputs[state].extend(outputs[failure[state]])
+        row, fallback = state * ALPHABET, failure[state] * ALPHABET
+        for code in range(ALPHABET - 1):
+            child = goto[state].get(code)
+            if child is None:
+                transitions[row + code] = transitions[fallback + code]
+            else:
+                failure[child] = transitions[fallback + code]
+                transitions[row + code] = child
+                queue.append(child)
+    return transitions, [tuple(output) or None for output in outputs]
+
+
+class Annotator(object):
+    """
+    A library of dnafeatures compiled for finding them in molecules. Takes
+    dicts with a name, category and pattern, e.g. as delimited.parse reads
+    them from a dnafeature.csv. Patterns holding anything but ACGT cannot be
+    matched exactly and are skipped.
+    """
+
+    def __init__(self, features):
+        self.features = []
+        patterns = []
+        for record in features:
+            feature = make_feature(record)
+            bases = feature['pattern']['bases']
+            if not bases or bases.translate(None, b'ACGT'):
+                log.warn("Skipping feature %s, its pattern is not ACGT",
+                         feature['name'])
+                continue
+            index = len(self.features)
+            self.features.append(feature)
+            patterns.append((bases, (index, 1)))
+            reverse = sequtils.get_reverse_complement(bases)
+            if reverse != bases:  # palindromes are found once, on strand 1
+                patterns.append((reverse, (index, -1)))
+        self.max_length = max([len(bases) for bases, _ in patterns] or [0])
+        self.transitions, self.outputs = build_automaton(patterns)
+
+    def __getstate__(self):
+        return {
+            'features': self.features,
+            'max_length': self.max_length,
+            'transitions': array.array(b'l', self.transitions),
+            'outputs': dict((state, output) for state, output in
+                            enumerate(self.outputs) if output),
+            'states': len(self.outputs),
+        }
+
+    def __setstate__(self, state):
+        self.features = state['features']
+        self.max_length = state['max_length']
+        self.transitions = state['transitions'].tolist()
+        self.outputs = [None] * state['states']
+        for index, output in state['outputs'].iteritems():
+            self.outputs[index] = output
+
+    def dump(self, open_file):
+        """Save the compiled library to an open binary file"""
+        cPickle.dump(self, open_file, cPickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, open_file):
+        """Load a library saved with dump()"""
+        annotator = cPickle.load(open_file)
+        if not isinstance(annotator, cls):
+            raise TypeError("Not a compiled feature library")
+        return annotator
+
+    def find(self, bases, is_circular=False):
+        """
+        Yield a Match for every occurrence of a library feature on either
+        strand, in order of its end. Coordinates are pythonic and on the
+        forward strand, a start after the end spanning the origin.
+        """
+        length = len(bases)
+        bases = sequtils.extend_circular(bases, is_circular, self.max_length)
+        transitions, outputs = self.transitions, self.outputs
+        state = 0
+        for position, code in enumerate(bytearray(bases.translate(BASE_CODES))):
+            state = transitions[state * ALPHABET + code]
+            if outputs[state] is None:
+                continue
+            for pattern_length, (index, strand) in outputs[state]:
+                span = sequtils.origin_span(position + 1 - pattern_length,
+                                            position + 1, length)
+                if span is not None:
+                    yield Match(span[0], span[1], strand, index)
+
+    def annotate(self, bases, is_circular=False):
+        """
+        The dnafeatures found in a molecule, in the shape genbank.parse
+        gives them, each with its own copy of the library feature.
+        """
+        annotations = []
+        for match in self.find(bases, is_circular):
+            location = {'start': match.start, 'end': match.end,
+                        'strand': match.strand}
+            segment = dict(location, partial_start=False, partial_end=False)
+            annotation = dict(location, segments=[segment])
+            annotation['dnafeature'] = copy.deepcopy(
+                self.features[match.feature])
+            annotations.append(annotation)
+        return annotations
+
+
+def annotate_record(record, annotator):
+    """
+    Add the library features found in a parsed molecule record to its
+    dnafeatures
+    """
+    bases = sequtils.record_bases(record)
+    found = annotator.annotate(bases, record.get('is_circular', False))
+    record.setdefault('dnafeatures', []).extend(found)
+    return record
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Transparent decompression of gzip and BGZF input.
+
+Compressed files are recognized by their magic bytes rather than their
+extension and decompressed as a stream, so the parsers only ever see an
+object with read(). BGZF (blocked gzip, as written by bgzip) is a series of
+independent gzip members of at most 64 KiB each. Their size is given in the
+header, so the blocks can be cut out of the file cheaply and inflated in a
+pool of threads, zlib releasing the GIL while it inflates.
+"""
+from __future__ import division
+from __future__ import absolute_import
+
+import gzip
+import itertools
+import multiprocessing
+import os
+import struct
+import zlib
+from multiprocessing.pool import ThreadPool
+
+from dgparse.exc import FormatException
+
+GZIP_MAGIC = b'\x1f\x8b\x08'
+EXTENSIONS = ('.gz', '.bgz', '.bgzf')
+BLOCKS_PER_BATCH = 64  # blocks handed to the pool at a time, per worker
+
+# fixed gzip header fields up to and including XLEN
+GZIP_HEADER = struct.Struct(b'<4BI2BH')
+FEXTRA = 4
+
+
+def strip_extension(path):
+    """The extension of path which names its format, looking through .gz"""
+    root, extension = os.path.splitext(path)
+    if extension.lower() in EXTENSIONS:
+        extension = os.path.splitext(root)[-1]
+    return extension
+
+
+def read_header(raw):
+    """Read a gzip member header up to the end of its extra field"""
+    header = raw.read(GZIP_HEADER.size)
+    if len(header) == GZIP_HEADER.size and header.startswith(GZIP_MAGIC):
+        flags, xlen = ord(header[3]), GZIP_HEADER.unpack(header)[-1]
+        if flags & FEXTRA:
+            header += raw.read(xlen)
+    return header
+
+
+def read_bgzf_header(header):
+    """
+    Return the total size of the BGZF block starting with header, or None
+    if header does not start a BGZF block.
+    """
+    if len(header) < GZIP_HEADER.size or not header.startswith(GZIP_MAGIC):
+        return None
+    fields = GZIP_HEADER.unpack_from(header)
+    flags, xlen = fields[3], fields[-1]
+    if not flags & FEXTRA:
+        return None
+    extra = header[GZIP_HEADER.size:GZIP_HEADER.size + xlen]
+    position = 0
+    while position + 4 <= len(extra):
+        tag = extra[position:position + 2]
+        size, = struct.unpack_from(b'<H', extra, position + 2)
+        if tag == b'BC' and size == 2:
+            block_size, = struct.unpack_from(b'<H', extra, position + 4)
+            return block_size + 1
+        position += 4 + size
+    return None
+
+
+def inflate_block(block):
+    """Decompress one BGZF block and check it against its trailer"""
+    try:
+        xlen, = struct.unpack_from(b'<H', block, 10)
+        payload = block[GZIP_HEADER.size + xlen:-8]
+        crc, size = struct.unpack_from(b'<II', block, len(block) - 8)
+        data = zlib.decompressobj(-zlib.MAX_WBITS).decompress(payload)
+    except (struct.error, zlib.error) as exception:
+        raise FormatException("Corrupt BGZF block: {0}".format(exception))
+    if len(data) != size or zlib.crc32(data) & 0xffffffff != crc:
+        raise FormatException("Corrupt BGZF block")
+    return data
+
+
+class BgzfReader(object):
+    """
+    A read only file over the decompressed contents of a BGZF file. Blocks
+    are inflated in batches by a pool of threads, the next batch while the
+    current one is being read.
+    """
+
+    def __init__(self, raw, workers=None):
+        self.raw = raw
+        self.name = getattr(raw, 'name', None)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.pool = None
+        self.rewind()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def rewind(self):
+        self.raw.seek(0)
+        self.blocks = self.iter_blocks()
+        self.buffer = b''
+
+    def seek(self, offset, whence=0):
+        """Only rewinding is supported"""
+        if offset or whence:
+            raise IOError("BGZF input can only be rewound")
+        self.rewind()
+
+    def iter_raw_blocks(self):
+        """Cut the compressed blocks out of the file"""
+        while True:
+            header = read_header(self.raw)
+            if not header:
+                return
+            block_size = read_bgzf_header(header)
+            if block_size is None:
+                raise FormatException("Not a BGZF block at offset {0}".format(
+                    self.raw.tell() - len(header)))
+            rest = self.raw.read(block_size - len(header))
+            if len(header) + len(rest) < block_size:
+                raise FormatException("Truncated BGZF block")
+            yield header + rest
+
+    def iter_blocks(self):
+        """Yield the decompressed blocks in file order"""
+        raw_blocks = self.iter_raw_blocks()
+        if self.workers < 2:
+            for block in raw_blocks:
+                yield inflate_block(block)
+            return
+        if self.pool is None:
+            self.pool = ThreadPool(self.workers)
+        batch_size = self.workers * BLOCKS_PER_BATCH
+        pending = self.pool.map_async(
+            inflate_block, list(itertools.islice(raw_blocks, batch_size)))
+        while True:
+            inflated = pending.get()
+            if not inflated:
+                return
+            pending = self.pool.map_async(
+                inflate_block, list(itertools.islice(raw_blocks, batch_size)))
+            for data in inflated:
+                yield data
+
+    def read(self, size=-1):
+        chunks = [self.buffer]
+        available = len(self.buffer)
+        while size < 0 or available < size:
+            data = next(self.blocks, None)
+            if data is None:
+                break
+            chunks.append(data)
+            available += len(data)
+        data = b''.join(chunks)
+        if size < 0:
+            size = len(data)
+        self.buffer = data[size:]
+        return data[:size]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        self.raw.close()
+
+
+def open_file(path, workers=None):
+    """
+    Open a file for reading, decompressing it on the fly if it is gzip or
+    BGZF compressed whatever its extension.
+    """
+    raw = open(path, 'rb')
+    header = read_header(raw)
+    raw.seek(0)
+    if read_bgzf_header(header):
+        return BgzfReader(raw, workers)
+    if header.startswith(GZIP_MAGIC):
+        raw.close()
+        return gzip.open(path, 'rb')
+    return raw
@@ -8,6 +8,7 @@ import csv
 import os
 import functools
 
+from .lines import iter_lines
 from .sequtils import dotsetter
 
 
@@ -41,5 +42,5 @@ def parse(open_file, fieldnames=None, record_type=None, delimiter=b","):
         record_type = os.path.basename(getattr(open_file, 'name', 'na.unk'))
     record_cleaner = functools.partial(clean_record, record_type)
     return [record_cleaner(row)
-            for row in csv.DictReader(open_file, fieldnames,
+            for row in csv.DictReader(iter_lines(open_file), fieldnames,
                                       delimiter=delimiter)]
@@ -20,6 +20,12 @@ class FormatException(ParserException):
     pass
 
 
+class RichTextFormat(FormatException):
+    """
+    Use when a text file has been saved as RTF
+    """
+
+
 class UndefinedRecordType(FormatException):
     """
     Use when no record type is stated or inferred.
@@ -47,3 +53,8 @@ class NoSequence(ValidationError):
 class NullCoordinates(ParserException):
     """Features must have a length of 1 or more"""
     pass
+
+
+class InvalidLocation(FormatException):
+    """Feature locations must follow the feature table grammar"""
+    pass
@@ -1,17 +1,20 @@
 from . import parse_fasta
-from dgparse.exc import ParserException
+from . import index
+from dgparse.exc import ParserException, RichTextFormat
 
 
-def parse(open_file):
-    'Interface compatibility for old fasta parser'
-    result = parse_fasta.parse_fasta_file(open_file)
+def parse(open_file, packed=False, canonical=False):
+    'Interface compatibility for old fasta parser, returns the first record'
+    try:
+        records = parse_fasta.iter_fasta(open_file, packed=packed,
+                                         canonical=canonical)
+        result = next(records, None)
+        if result and next(records, None) is None:
+            parse_fasta.attach_file_contents(open_file, result)
+    except RichTextFormat:
+        result = None
     if result:
-        result = result[0]
-        result.update({
-            'sequence': {
-                'bases': result['sequence']['seq'],
-                'sha1': result['sequence']['sha1'],
-            }
-        })
+        sequence = result['sequence']
+        sequence['bases'] = sequence.pop('seq')
         return result
     raise ParserException('Fasta parse fail!')
@@ -0,0 +1,161 @@
+# encoding=utf-8
+"""
+Index a Fasta file samtools style (.fai) and fetch regions by byte offset.
+
+Each index entry records where the sequence of a record starts in the file
+and how its lines are laid out, so the bytes of any region can be located
+arithmetically and read straight from a memory map of the file.
+"""
+import collections
+import logging
+import mmap
+import os
+
+from dgparse import sequtils
+from dgparse.exc import FormatException
+
+log = logging.getLogger(__name__)
+
+FaiEntry = collections.namedtuple(
+    'FaiEntry', ['name', 'length', 'offset', 'linebases', 'linewidth'])
+
+
+def build_index(fasta_file):
+    """
+    Scan an open (binary mode) fasta file and return its FaiEntries in file
+    order. Every sequence line of a record but the last must be equally long.
+    """
+    entries = []
+    entry = None
+    position = 0
+    short_line = False  # seen a short line, which must be the record's last
+    for line in fasta_file:
+        width = len(line)
+        if '\r' in line.rstrip('\r\n'):
+            raise FormatException("Cannot index a fasta file with CR only "
+                                  "line endings")
+        if line.startswith('>'):
+            if entry is not None:
+                entries.append(FaiEntry(**entry))
+            name = line[1:].split(None, 1)
+            entry = {'name': name[0] if name else '', 'length': 0,
+                     'offset': position + width, 'linebases': 0,
+                     'linewidth': 0}
+            short_line = False
+        elif entry is not None:
+            bases = len(line.rstrip('\r\n'))
+            if bases and short_line:
+                msg = "Different line length in sequence '{0}'".format(
+                    entry['name'])
+                raise FormatException(msg)
+            if not bases:
+                short_line = bool(entry['linebases'])
+            elif not entry['linebases']:
+                entry['linebases'], entry['linewidth'] = bases, width
+            elif bases > entry['linebases']:
+                msg = "Different line length in sequence '{0}'".format(
+                    entry['name'])
+                raise FormatException(msg)
+            else:
+                short_line = bases < entry['linebases']
+            entry['length'] += bases
+        position += width
+    if entry is not None:
+        entries.append(FaiEntry(**entry))
+    return entries
+
+
+def write_index(entries, fai_file):
+    """Write FaiEntries to an open file in .fai format"""
+    for entry in entries:
+        fai_file.write('\t'.join(str(field) for field in entry) + '\n')
+
+
+def read_index(fai_file):
+    """Read an open .fai file into an ordered mapping of name to FaiEntry"""
+    index = collections.OrderedDict()
+    for line in fai_file:
+        fields = line.rstrip('\r\n').split('\t')
+        if len(fields) < 5:
+            continue
+        entry = FaiEntry(fields[0], *map(int, fields[1:5]))
+        index[entry.name] = entry
+    return index
+
+
+class IndexedFasta(object):
+    """
+    Random access to the records of a fasta file on disk. The .fai next to
+    the file is used if present, otherwise it is built (and saved when
+    save_index is True and the directory is writable).
+
+    Usage:
+        with IndexedFasta('genome.fa') as fasta:
+            bases = fasta.fetch('chr1', 1000, 1020, strand=-1)
+    """
+
+    def __init__(self, path, save_index=True):
+        self.path = path
+        fai_path = path + '.fai'
+        if os.path.exists(fai_path):
+            with open(fai_path, 'rb') as fai_file:
+                self.index = read_index(fai_file)
+        else:
+            with open(path, 'rb') as fasta_file:
+                entries = build_index(fasta_file)
+            self.index = collections.OrderedDict(
+                (entry.name, entry) for entry in entries)
+            if save_index:
+                try:
+                    with open(fai_path, 'wb') as fai_file:
+                        write_index(entries, fai_file)
+                except (IOError, OSError) as exception:
+                    # e.g. a reference in a read-only directory
+                    log.info("Index not saved: {0}".format(exception))
+        self.handle = open(path, 'rb')
+        size = os.fstat(self.handle.fileno()).st_size
+        self.map = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ) \
+            if size else ''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if hasattr(self.map, 'close'):
+            self.map.close()
+        self.handle.close()
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def byte_offset(self, entry, position):
+        """File offset of a 0-based position in a record"""
+        lines, column = divmod(position, entry.linebases)
+        return entry.offset + lines * entry.linewidth + column
+
+    def fetch(self, name, start=0, end=None, strand=1):
+        """
+        Return the bases [start, end) of the named record, reverse
+        complemented when strand is negative. Reads only the bytes of the
+        region.
+        """
+        try:
+            entry = self.index[name]
+        except KeyError:
+            raise KeyError("No sequence named '{0}' in {1}".format(
+                name, self.path))
+        end = entry.length if end is None else min(end, entry.length)
+        if start < 0 or start >= end:
+            return ''
+        first = self.byte_offset(entry, start)
+        last = self.byte_offset(entry, end - 1) + 1
+        bases = self.map[first:last].translate(None, '\r\n')
+        if strand < 0:
+            bases = sequtils.get_reverse_complement(bases)
+        return bases
@@ -0,0 +1,141 @@
+# encoding=utf-8
+"""
+Parse large multi-record Fasta files in several processes.
+
+The file is cut into byte ranges whose boundaries are moved forward to the
+start of the next header line, so every shard holds whole records. Each
+shard is parsed by iter_fasta in a worker process and the records are
+streamed back in file order, or as soon as a shard is done.
+"""
+import multiprocessing
+import os
+import re
+
+from dgparse.fasta.parse_fasta import iter_fasta
+from dgparse.packed import PackedSequence
+
+SHARD_SIZE = 8 << 20  # smallest shard worth sending to a worker
+SHARDS_PER_WORKER = 4
+HEADER_START = re.compile(r'[\r\n]>')
+
+
+class FileRange(object):
+    """A read only file over the bytes [start, end) of a file on disk"""
+
+    def __init__(self, path, start, end):
+        self.name = path
+        self.handle = open(path, 'rb')
+        self.handle.seek(start)
+        self.remaining = end - start
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
+
+
+def next_header(fasta_file, position, block_size=1 << 16):
+    """
+    Return the offset of the first header line starting at or after position
+    in an open binary file, or None if there is none.
+    """
+    fasta_file.seek(max(position - 1, 0))
+    offset = fasta_file.tell()
+    tail = ''
+    while True:
+        block = fasta_file.read(block_size)
+        if not block:
+            return None
+        found = HEADER_START.search(tail + block)
+        if found:
+            return offset - len(tail) + found.start() + 1
+        offset += len(block)
+        tail = block[-1:]
+
+
+def shard_ranges(path, shards):
+    """Split a fasta file into at most shards (start, end) byte ranges"""
+    size = os.path.getsize(path)
+    step = max(size // max(shards, 1), SHARD_SIZE)
+    boundaries = [0]
+    with open(path, 'rb') as fasta_file:
+        while boundaries[-1] + step < size:
+            boundary = next_header(fasta_file, boundaries[-1] + step)
+            if boundary is None:
+                break
+            boundaries.append(boundary)
+    boundaries.append(size)
+    return zip(boundaries[:-1], boundaries[1:])
+
+
+def parse_shard(args):
+    """
+    Parse the records in one byte range of a fasta file. Records are sent
+    back as flat tuples, which pickle several times faster than the dicts.
+    """
+    path, start, end, default, canonical = args
+    shard = FileRange(path, start, end)
+    try:
+        return [(seqrec['description'], seqrec['name'],
+                 seqrec.get('is_circular'), str(seqrec['sequence']['seq']),
+                 seqrec['sequence']['sha1'],
+                 seqrec['sequence'].get('canonical_sha1'))
+                for seqrec in iter_fasta(shard, default, canonical=canonical)]
+    finally:
+        shard.close()
+
+
+def unpack_records(records, default, packed=False):
+    """Rebuild the record dicts of a parsed shard"""
+    for description, name, is_circular, bases, sha1, canonical in records:
+        seqrec = dict(default)
+        seqrec['description'] = description
+        seqrec['file_format'] = u'fasta'
+        seqrec['sequence'] = {
+            'seq': PackedSequence(bases) if packed else unicode(bases),
+            'sha1': sha1,
+        }
+        if canonical is not None:
+            seqrec['sequence']['canonical_sha1'] = canonical
+        seqrec['length'] = len(bases)
+        if is_circular is not None:
+            seqrec['is_circular'] = is_circular
+        seqrec['name'] = name
+        yield seqrec
+
+
+def iter_fasta_parallel(path, workers=None, ordered=True, default={},
+                        packed=False, canonical=False):
+    """
+    Parse the fasta file at path in a pool of workers, yielding the same
+    records as iter_fasta. With ordered=False records are yielded shard by
+    shard as the workers finish, which keeps the pool busiest.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    ranges = shard_ranges(path, workers * SHARDS_PER_WORKER)
+    if workers == 1 or len(ranges) < 2:
+        for start, end in ranges:
+            shard = FileRange(path, start, end)
+            try:
+                for seqrec in iter_fasta(shard, default, packed, canonical):
+                    yield seqrec
+            finally:
+                shard.close()
+        return
+    pool = multiprocessing.Pool(min(workers, len(ranges)))
+    try:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        tasks = [(path, start, end, default, canonical)
+                 for start, end in ranges]
+        for records in mapper(parse_shard, tasks):
+            for seqrec in unpack_records(records, default, packed):
+                yield seqrec
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
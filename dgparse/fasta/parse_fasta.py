@@ -4,17 +4,23 @@ Parse a Fasta file.
 """
 import hashlib
 import logging
+import os
 
 
 from exceptions import UnicodeDecodeError
 from exceptions import TypeError
 from dgparse.sequtils import DNA_CHAR
-from dgparse.sequtils import NOT_DNA
+from dgparse.sequtils import normalize_bases
+from dgparse.sequtils import canonical_sha1
 
-from dgparse.exc import ParserException
+from dgparse.exc import ParserException, RichTextFormat
+from dgparse.lines import iter_lines
+from dgparse.packed import PackedSequence
 
 log = logging.getLogger(__name__)
 
+MAX_FILE_CONTENTS = 1 << 20  # bytes, of the file kept with a single record
+
 
 def parse_fasta_str(fasta_str, default={}):
     """
@@ -72,10 +78,9 @@ def parse_fasta_str(fasta_str, default={}):
             pass
     # Now process the header-body pairs into sequence records
     for seqrec in records.itervalues():
-        lines = seqrec['sequence']
-        seqstr = unicode("".join(lines).replace(" ", "").replace("\r",
-                                                                 "").upper())
-        if NOT_DNA.search(seqstr):
+        seqstr, illegal = normalize_bases(u"".join(seqrec['sequence']),
+                                          delete=" \r")
+        if illegal:
             raise ParserException('Invalid sequence.')
         new_sequence = {
             'sha1': hashlib.sha1(seqstr).hexdigest(),
@@ -89,28 +94,72 @@ def parse_fasta_str(fasta_str, default={}):
     return result
 
 
-def parse_fasta_file(fasta_file, default={}):
+def parse_fasta_file(fasta_file, default={}, workers=None, packed=False,
+                     canonical=False):
     """
     Parse a fasta file uploaded rather than a fasta formatted string pasted into
     a form field.
     The result of this should be a de-duplicated list of dictionaries
+    Given a number of workers, a plain file on disk is parsed in that many
+    processes. Other file objects, e.g. decompressing ones, are read serially.
     """
-    records = {}
     result = []
+    seen = set()
+    records = iter_fasta(fasta_file, default, packed, canonical)
+    if workers and isinstance(fasta_file, file) and \
+            os.path.isfile(fasta_file.name):
+        from dgparse.fasta.parallel import iter_fasta_parallel
+        records = iter_fasta_parallel(fasta_file.name, workers, True, default,
+                                      packed, canonical)
+    try:
+        for seqrec in records:
+            key = (seqrec['description'], seqrec['sequence']['sha1'])
+            if key not in seen:
+                seen.add(key)
+                result.append(seqrec)
+    except RichTextFormat:
+        return None
+    if len(result) == 1:
+        attach_file_contents(fasta_file, result[0])
+    return result
+
+
+def attach_file_contents(fasta_file, seqrec, limit=MAX_FILE_CONTENTS):
+    """
+    Keep the source of a single record file alongside the record, unless it
+    is over limit bytes, reading no more than that
+    """
+    try:
+        fasta_file.seek(0)
+        contents = fasta_file.read(limit + 1)
+    except (AttributeError, IOError):
+        return seqrec  # not a seekable file
+    if len(contents) <= limit:
+        seqrec['file_contents'] = contents
+    return seqrec
+
+
+def iter_fasta(fasta_file, default={}, packed=False, canonical=False):
+    """
+    Parse an open fasta file lazily, yielding one sequence record at a time.
+    The sha1 and length of each sequence are updated as its lines are read,
+    so only the record being parsed is held in memory. With packed=True the
+    sequence seq is a PackedSequence rather than unicode, and with
+    canonical=True records marked circular get a canonical_sha1.
+    """
+    seqrec = None
     count = 0
-    current_header = None
-    saved_contents = list()
-    for line in fasta_file.readlines():
-        saved_contents.append(line)
+    for line in iter_lines(fasta_file):
         if "rtf" in line:
-            return None
-        if line == "":
-            return  # Premature end of file, or just empty?
-        if line and ">" in line:
+            raise RichTextFormat("This file is RTF formatted")
+        if ">" in line:
+            if seqrec is not None:
+                yield finish_record(seqrec, packed, canonical)
             seqrec = dict(default)  # make new seqrec
             seqrec['description'] = unicode(line, 'utf-8')
             seqrec['file_format'] = u'fasta'
-            seqrec['sequence'] = []
+            seqrec['sequence'] = {'chunks': [], 'sha1': hashlib.sha1()}
+            seqrec['length'] = 0
             if "linear" in line:
                 seqrec['is_circular'] = False
             if 'circular' in line:
@@ -119,51 +168,43 @@ def parse_fasta_file(fasta_file, default={}):
                 name = parse_fasta_header_line(line)
             except IndexError:
                 assert not line, repr(line)
-                name = fasta_file.name.split("/")[-1]
+                name = getattr(fasta_file, 'name', 'fasta').split("/")[-1]
                 if count > 0:
                     name = name + "-" + str(count)
                 count += 1
             seqrec['name'] = unicode(name, 'utf-8')
-            records[line] = seqrec  # index by header line
-            current_header = line
         elif line and (line[0] in DNA_CHAR):
-
             if "N" in line:
                 log.warn("Ambiguous Base found in this sequence. Removing")
-            if not current_header:
+            if seqrec is None:
                 msg = "This file does not containa valid FASTA header line.\
                        Please include >Name on the first line of the file."
                 raise ParserException(msg)
+            # Remove trailing whitespace, and any internal spaces
+            bases, illegal = normalize_bases(line, delete='{}/ \r\n\\')
+            if illegal:
+                msg = u"Invalid character found in {n} at {i}".format(
+                    n=seqrec[u'name'], i=seqrec['length'] + illegal[0])
+                raise ParserException(msg)
+            sequence = seqrec['sequence']
+            sequence['chunks'].append(bases)
+            sequence['sha1'].update(bases)
+            seqrec['length'] += len(bases)
+    if seqrec is not None:
+        yield finish_record(seqrec, packed, canonical)
 
-            clean_line = line.translate(None, '{}/ \n\\')
-            if not current_header:
-                raise ParserException("The Current Header is NONE")
 
-            records[current_header]['sequence'].append(clean_line)
-            # Remove trailing whitespace, and any internal spaces
-            # (and any embedded \r which are possible in mangled files
-            # when not opened in universal read lines mode)
-        else:
-            pass
-    if len(records) == 1:
-        records[current_header]['file_contents'] = '\n'.join(saved_contents)
-    # Now process the header-body pairs into sequence records
-    for seqrec in records.itervalues():
-        lines = seqrec['sequence']
-        seqstr = unicode("".join(lines).replace(" ", "").replace("\r",
-                                                                 "").upper())
-        if NOT_DNA.search(seqstr):
-            msg = u"Invalid character found in {n}".format(n=seqrec[u'name'])
-            raise ParserException(msg)
-        else:
-            new_sequence = {
-                'seq': seqstr,
-                'sha1': hashlib.sha1(seqstr).hexdigest(),
-            }
-        seqrec['sequence'] = new_sequence
-        seqrec['length'] = len(seqstr)
-        result.append(seqrec)
-    return result
+def finish_record(seqrec, packed=False, canonical=False):
+    """Replace the running sequence state of a record with its final value"""
+    sequence = seqrec['sequence']
+    bases = ''.join(sequence['chunks'])
+    seqrec['sequence'] = {
+        'seq': PackedSequence(bases) if packed else unicode(bases),
+        'sha1': sequence['sha1'].hexdigest(),
+    }
+    if canonical and seqrec.get('is_circular'):
+        seqrec['sequence']['canonical_sha1'] = canonical_sha1(bases)
+    return seqrec
 
 
 def parse_fasta_header_line(line):
@@ -1,9 +1,11 @@
 import hashlib
-import copy
 from . import main
+from . import origin
+from . import views
 from ..exc import ParserException
 
 from dgparse import sequtils
+from dgparse.packed import PackedSequence
 
 def pick_a_name(dict_):
     """Pick a name from a dnafeature dict. The rules are as follows:
@@ -36,52 +38,147 @@ def drop_source(feature_dict):
         return True
 
 
-def parse(open_file):
-    'Parse an open genbank file and convert it into standard DeskGen format'
-    result = main.init(open_file)
-    try:
-        bases = result.pop('origin')
-    except KeyError:
-        raise ParserException('No sequence could be parsed')
-    result.update({
-        'sequence': {
+def extract_pattern(context, start, end, strand):
+    'Slice the bases of a feature from its SequenceContext, on its strand'
+    pattern = context.extract(start, end, strand) # assumed pythonic coordinates
+    if not pattern:
+        raise ParserException('No bases could be parsed for a feature')
+    return pattern
+
+
+def split_feature(feature):
+    'Split a parsed feature into its annotation and dnafeature fields'
+    unpack = dict(feature)
+    annotation = dict()
+    for key in 'start', 'end', 'strand', 'segments':
+        annotation[key] = unpack.pop(key)
+    dnafeature = {
+        'name': pick_a_name(unpack),
+        'category': unpack.pop('category', None),
+        'description': pick_description(unpack),
+    }
+    dnafeature['properties'] = unpack # anything else
+    return annotation, dnafeature
+
+
+def make_annotation(context, feature):
+    'Build a dnafeature annotation with its pattern extracted'
+    annotation, dnafeature = split_feature(feature)
+    pattern = extract_pattern(context, annotation['start'], annotation['end'],
+                              annotation['strand'])
+    dnafeature.update({
+        'length': len(pattern),
+        'pattern': {
+            'bases': pattern,
+            'sha1': hashlib.sha1(pattern).hexdigest()
+        },
+    })
+    annotation['dnafeature'] = dnafeature
+    return annotation
+
+
+class FeatureSpan(object):
+    'Where a feature lies on its molecule, to extract its pattern on demand'
+    __slots__ = ('context', 'start', 'end', 'strand')
+
+    def __init__(self, context, start, end, strand):
+        self.context = context
+        self.start = start
+        self.end = end
+        self.strand = strand
+
+    def extract(self):
+        return extract_pattern(self.context, self.start, self.end, self.strand)
+
+    def length(self):
+        if self.start < self.end:
+            return self.end - self.start
+        if self.context.is_circular:
+            return len(self.context) - self.start + self.end
+        return len(self.extract())  # raises as the pattern would
+
+
+def make_feature_view(context, feature):
+    'A dnafeature annotation built, and its pattern extracted, on demand'
+    return views.FeatureView(build_feature_view, context, feature)
+
+
+def build_feature_view(context, feature):
+    'Build the annotation of a FeatureView, holding a DnaFeatureView'
+    annotation, dnafeature = split_feature(feature)
+    span = FeatureSpan(context, annotation['start'], annotation['end'],
+                       annotation['strand'])
+    annotation['dnafeature'] = views.DnaFeatureView(dnafeature, span)
+    return annotation
+
+
+def make_location(context, feature):
+    'Build a dnafeature annotation without a pattern, for records sans ORIGIN'
+    annotation, dnafeature = split_feature(feature)
+    annotation['dnafeature'] = dnafeature
+    return annotation
+
+
+def parse(open_file, lazy=False, sections=None, packed=False, canonical=False,
+          strict=False):
+    '''
+    Parse an open genbank file and convert it into standard DeskGen format.
+    With lazy=True the dnafeatures are FeatureViews whose pattern and length
+    are only computed when first accessed. Pass sections, e.g.
+    ('LOCUS', 'FEATURES'), to parse only those and skip the rest of the file;
+    the output then lacks whatever the skipped sections would have provided.
+    With packed=True the sequence bases are held as a PackedSequence, and with
+    canonical=True circular sequences get a canonical_sha1. With strict=True
+    a base outside the IUPAC alphabet raises a ParserException.
+    '''
+    return convert(main.init(open_file, sections=sections), lazy, sections,
+                   packed, canonical, strict)
+
+
+def iter_genbank(open_file, lazy=False, sections=None, packed=False,
+                 canonical=False, strict=False):
+    '''
+    Parse an open genbank file holding any number of concatenated records,
+    such as a flat-file database release, yielding each in standard DeskGen
+    format as soon as its // is reached.
+    '''
+    for result in main.iter_records(open_file, sections):
+        yield convert(result, lazy, sections, packed, canonical, strict)
+
+
+def convert(result, lazy=False, sections=None, packed=False, canonical=False,
+            strict=False):
+    'Convert the raw dict of a single parsed record into DeskGen format'
+    wanted = lambda name: sections is None or name in sections
+    bases = result.pop('origin', None)
+    if bases is not None:
+        if strict:
+            origin.check_bases(bases)
+        sha1 = hashlib.sha1(bases).hexdigest()
+        if packed:
+            bases = PackedSequence(bases)
+        result['sequence'] = {
             'bases': bases,
-            'sha1': hashlib.sha1(bases).hexdigest(),
+            'sha1': sha1,
         }
-    })
-    try:
+    elif wanted('ORIGIN'):
+        raise ParserException('No sequence could be parsed')
+    if 'locus' in result:
         result['is_circular'] = result['locus']['orientation']
-    except KeyError:
+    elif wanted('LOCUS'):
         raise ParserException('No orientation could be parsed')
-    result['dnafeatures'] = list() # a list of dnafeature annotations
+    if canonical:
+        sequtils.add_canonical_sha1(result)
+    if not wanted('FEATURES'):
+        return result
     features = result.get('features', {}) # TODO: pop this, replaced by 'dnafeatures'
-    features = filter(drop_source, features) 
-    for feature in features:
-        print "Feature %s"%(feature)
-        unpack = copy.deepcopy(feature)
-        annotation = dict()
-        for key in 'start', 'end', 'strand':
-            annotation[key] = unpack.pop(key)
-        if annotation['start'] < annotation['end']:
-            bases = result['sequence']['bases'][annotation['start']:annotation['end']]
-        elif result['is_circular']:
-            # Feature spans replication origin
-            bases = result['sequence']['bases'][annotation['start']:] + \
-                    result['sequence']['bases'][:annotation['end']]
-        if not bases:
-            raise ParserException('No bases could be parsed for a feature')
-        if annotation['strand'] < 0:
-            bases = sequtils.get_reverse_complement(bases) # assumed pythonic coordinates
-        annotation['dnafeature'] = {
-            'name': pick_a_name(unpack),
-            'category': unpack.pop('category', None),
-            'description': pick_description(unpack),
-            'length': len(bases),
-            'pattern': {
-                'bases': bases,
-                'sha1': hashlib.sha1(bases).hexdigest()
-            },
-        }
-        annotation['dnafeature']['properties'] = unpack # anything else
-        result['dnafeatures'].append(annotation)
+    features = filter(drop_source, features)
+    if bases is None:
+        annotate = make_location
+    else:
+        annotate = make_feature_view if lazy else make_annotation
+    # one context per record, so the minus strand is computed at most once
+    context = sequtils.SequenceContext(bases, result.get('is_circular', False))
+    result['dnafeatures'] = [annotate(context, feature)
+                             for feature in features]
     return result
@@ -1,16 +1,16 @@
 from .constants import GENBANK_HEADERS
 
 
-def recurse_definition(line, lines, out):
-    columns = line.split()
-    if not columns:
-        return recurse_definition(next(lines), lines, out)
-    if columns[0] != 'DEFINITION':
-        if columns[0] in GENBANK_HEADERS:
-            return line, lines, out
-        out['definition'] = ' '.join([out['definition'], ' '.join(columns)])
-        return recurse_definition(next(lines), lines, out)
-    if columns[0] == 'DEFINITION':
-        out['definition'] = ' '.join(columns[1:])
-        return recurse_definition(next(lines), lines, out)
-
+def parse_definition_lines(line, lines, out):
+    'Collect a (multi-line) DEFINITION, return the first line after it'
+    while line is not None:
+        columns = line.split()
+        if columns:
+            if columns[0] == 'DEFINITION':
+                out['definition'] = ' '.join(columns[1:])
+            elif columns[0] in GENBANK_HEADERS:
+                return line
+            else:
+                out['definition'] = ' '.join([out['definition'], ' '.join(columns)])
+        line = next(lines, None)
+    return None
@@ -1 +1 @@
-from .main import recurse_features
+from .main import parse_feature_lines
@@ -0,0 +1,191 @@
+# encoding=utf-8
+"""
+Parse INSDC feature location expressions into segments.
+For the full syntax see http://www.insdc.org/documents/feature_table.html#3.4
+
+A location is returned as a tuple of Segments in biological order, i.e. the
+order in which the segments are read 5' to 3' along the feature. Coordinates
+are pythonic [0, n), partial_start and partial_end flag the '<' and '>'
+markers on the lower and upper bound respectively. Gaps and spans on other
+entries cover no local bases and are left out.
+"""
+import collections
+import functools
+import itertools
+import re
+
+from dgparse.exc import InvalidLocation, NullCoordinates
+
+Segment = collections.namedtuple(
+    'Segment', ['start', 'end', 'strand', 'partial_start', 'partial_end'])
+
+TOKENS = re.compile(r'''
+    \s*(?:
+      (?P<number>\d+)
+    | (?P<word>[A-Za-z_][\w.]*)
+    | (?P<symbol>\.\.|[<>(),^.:])
+    )''', re.VERBOSE)
+
+# The bulk of locations are a plain or complemented range
+SIMPLE_RANGE = re.compile(r'^(complement\()?(<?)(\d+)\.\.(>?)(\d+)(?(1)\))$')
+
+# A span on another entry, e.g. J00194.1:100..202, or a gap, e.g. gap(10)
+NOT_LOCAL = re.compile(r'''
+    [A-Za-z_][\w.]*:[<>]?\d+(?:(?:\.\.|[.^])[<>]?\d+)?
+  | gap\([^)]*\)''', re.VERBOSE)
+
+# Operators which simply concatenate their arguments
+CONCATENATE = ('join', 'order', 'bond')
+
+CACHE_SIZE = 4096
+
+
+def lru_cache(maxsize):
+    """
+    Memoize a single argument function, keeping the most recently used
+    results. Hits only bump a counter; once full the least recently used
+    half is evicted in one go.
+    """
+    def decorator(func):
+        cache = {}
+        clock = itertools.count()
+
+        @functools.wraps(func)
+        def wrapper(key):
+            try:
+                entry = cache[key]
+            except KeyError:
+                if len(cache) >= maxsize:
+                    by_age = sorted(cache, key=lambda k: cache[k][1])
+                    for stale in by_age[:len(by_age) // 2 + 1]:
+                        del cache[stale]
+                entry = cache[key] = [func(key), None]
+            entry[1] = next(clock)
+            return entry[0]
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def tokenize(text):
+    """Split a location expression into (kind, value) tokens"""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKENS.match(text, position)
+        if match is None or match.end() == position:
+            msg = "Unexpected character in location {0!r} at {1}".format(
+                text, position)
+            raise InvalidLocation(msg)
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+class LocationParser(object):
+    """Recursive descent parser over the tokens of one location"""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or \
+                (value and token[1] != value):
+            msg = "Expected {0!r} but found {1!r} in location {2!r}".format(
+                value or kind, token[1], self.text)
+            raise InvalidLocation(msg)
+        self.position += 1
+        return token[1]
+
+    def parse(self):
+        segments = self.location()
+        if self.peek()[0] is not None:
+            msg = "Unexpected {0!r} in location {1!r}".format(
+                self.peek()[1], self.text)
+            raise InvalidLocation(msg)
+        return tuple(segments)
+
+    def location(self):
+        kind, value = self.peek()
+        if kind == 'word':
+            word = self.take()
+            if self.peek()[1] == ':':
+                self.take()  # a span of another entry, not local bases
+                self.span()
+                return []
+            return self.operator(word)
+        return self.span()
+
+    def operator(self, name):
+        self.take(value='(')
+        if name == 'gap':
+            while self.peek()[1] != ')':
+                self.take()
+            self.take()
+            return []
+        segments = self.location()
+        while self.peek()[1] == ',':
+            self.take()
+            segments.extend(self.location())
+        self.take(value=')')
+        if name == 'complement':
+            return [segment._replace(strand=-segment.strand)
+                    for segment in reversed(segments)]
+        if name in CONCATENATE:
+            return segments
+        raise InvalidLocation("Unknown location operator {0!r}".format(name))
+
+    def point(self):
+        partial = False
+        if self.peek()[1] in ('<', '>'):
+            self.take()
+            partial = True
+        return int(self.take('number')), partial
+
+    def span(self):
+        start, partial_start = self.point()
+        end, partial_end = start, partial_start
+        if self.peek()[1] in ('..', '.', '^'):
+            self.take()
+            end, partial_end = self.point()
+        # convert from [1,n] to pythonic [0,n) coordinate system
+        return [Segment(start - 1, end, 1, partial_start, partial_end)]
+
+
+@lru_cache(CACHE_SIZE)
+def parse_location(text):
+    """
+    Parse a location expression to a tuple of Segments. Identical locations
+    recur across gene/mRNA/CDS features so results are cached.
+    """
+    simple = SIMPLE_RANGE.match(text)
+    if simple:
+        complement, lower, start, upper, end = simple.groups()
+        return (Segment(int(start) - 1, int(end), -1 if complement else 1,
+                        bool(lower), bool(upper)),)
+    segments = LocationParser(text).parse()
+    if not segments:
+        raise NullCoordinates
+    return segments
+
+
+def parse_digits(text):
+    """
+    Fallback for locations outside the grammar: take the first and last
+    positions on this entry as a single segment.
+    """
+    positions = re.findall(r'\d+', NOT_LOCAL.sub('', text))
+    if not positions:
+        raise NullCoordinates
+    strand = -1 if 'complement' in text else 1
+    return (Segment(int(positions[0]) - 1, int(positions[-1]), strand,
+                    False, False),)
@@ -3,47 +3,85 @@ import re
 import string
 
 from .constants import FEATURE_TYPES, FEATURE_QUALIFIERS
+from .location import parse_location, parse_digits
 from ..constants import GENBANK_HEADERS
-from dgparse.exc import NullCoordinates
+from dgparse.exc import InvalidLocation, NullCoordinates
 logger = logging.getLogger(__name__)
 
 
 def parse_coord(coord):
     """Parse the coordinates"""
     # For full syntax see http://www.ddbj.nig.ac.jp/FT/full_index.html#3.4
-    # Suffice here to parse the first and last values
-    coord_dict = {'strand': -1 if "complement" in coord else 1}    
-    start = None
-    end = None
-    for pos in re.findall(r'\d+', coord):
-        if start is None:
-            start = int(pos)
-        end = int(pos)
-    # Note start > end and even start == end is possible for features which 
-    # span the origin of a plasmid circular coordinate system
-    if start == None or end == None:
-        raise NullCoordinates
-    start -= 1 # convert from [1,n] to pythonic [0,n) coordinate system
-    coord_dict.update({'start': start, 'end': end})
-    return coord_dict
-
-
-def recurse_features(line, lines, out):
-    'Handle blank lines, manage feature parsing'
-    tokens = line.strip().split()
-    if tokens[0] in GENBANK_HEADERS:
-        return line, lines, out
+    try:
+        segments = parse_location(coord)
+    except InvalidLocation as exception:
+        # Be greedy, suffice here to parse the first and last values
+        logger.info(exception)
+        segments = parse_digits(coord)
+    strand = -1 if all(seg.strand < 0 for seg in segments) else 1
+    # Report the span in the order the segments are written along the top
+    # strand. Note start > end and even start == end is possible for
+    # features which span the origin of a plasmid circular coordinate system
+    written = segments[::-1] if strand < 0 else segments
+    return {
+        'strand': strand,
+        'start': written[0].start,
+        'end': written[-1].end,
+        'segments': [dict(zip(seg._fields, seg)) for seg in segments],
+    }
+
+
+def parse_feature_lines(line, lines, out):
+    'Parse the feature table into out, return the first line after it'
+    location = None  # of the latest feature, until it is complete
+    while line is not None:
+        tokens = line.strip().split()
+        if tokens and (tokens[0] in GENBANK_HEADERS or not line[0].isspace()):
+            break  # the next section or the end of the record
+        if tokens:
+            location = parse_feature_line(line, location, out)
+        line = next(lines, None)
+    add_location(location, out)
+    # drop the features which could not be placed on this entry
+    out['features'] = [feature for feature in out['features']
+                       if 'start' in feature]
+    return line
+
+
+def add_location(location, out):
+    'Parse the finished location of the latest feature'
+    if location is None:
+        return
+    try:
+        out['features'][-1].update(parse_coord(location))
+    except NullCoordinates:
+        # e.g. gap(10) or J00194.1:100..202, no bases of this entry
+        logger.info("Skipping feature without local location {0!r}".format(
+            location))
+
+
+def parse_feature_line(line, location, out):
+    '''
+    Handle a single feature table line, starting or extending a feature.
+    Return the location of the latest feature while it may still continue
+    onto the next line, else None.
+    '''
     # Offsets per http://www.ddbj.nig.ac.jp/FT/full_index.html#3.4
     feature_key = line[5:20].strip()
     feature_content = line[21:].strip()
-    qualifier_match = re.match(r'/(\w+)=\"(.*)', feature_content)
     if feature_key:
-        # New feature, instantiate, initialize qualifier, append
+        # New feature, instantiate, append and collect its location
+        add_location(location, out)
         out['features'].append({'category': feature_key})
-        out['features'][-1].update(parse_coord(feature_content))
         if feature_key not in FEATURE_TYPES:
             logger.info("Feature '{0}' not recognised".format(feature_key))
-    elif qualifier_match:
+        return feature_content
+    if location is not None and location.count('(') > location.count(')'):
+        # Long locations are wrapped onto continuation lines
+        return location + feature_content
+    add_location(location, out)
+    qualifier_match = re.match(r'/(\w+)=\"(.*)', feature_content)
+    if qualifier_match and out['features']:
         # New qualifier, initialize and append
         qualifier_key = qualifier_match.group(1)
         qualifier_val = qualifier_match.group(2).rstrip('"')
@@ -54,7 +92,5 @@ def recurse_features(line, lines, out):
         # Assign first qualifier as default feature name
         if 'name' not in out['features'][-1]:
             out['features'][-1].update({'name': qualifier_val})
-    else:
-        pass
-        # Multiline qualifier, ignore remainder
-    return recurse_features(next(lines), lines, out)
+    # Otherwise a multiline qualifier, ignore remainder
+    return None
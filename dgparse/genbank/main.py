@@ -1,39 +1,59 @@
-import tempfile
 from . import locus
-from .features import recurse_features
-from .origin import recurse_origin
+from .features import parse_feature_lines
+from .origin import parse_origin_lines
+from ..lines import iter_lines
 
 
-def recurse_headers(line, lines, out):
+def parse_headers(line, lines, out, functions=None):
     '''
-    Try to select an appropriate function to continue parsing with, otherwise
-    skip the line.
+    Drive the parser. Hand each recognised header line to its section
+    function, which consumes its section and returns the first line it did
+    not use. Any other section is skipped. Runs until the // which
+    terminates the record and returns the line after it, or None when the
+    lines run out.
     '''
-    tokens = line.strip().split()
-    if not tokens:
-        return recurse_headers(next(lines), lines, out)
-    func = HEADER_FUNCTIONS.get(tokens[0], False)
-    if func is False:
-        return recurse_headers(next(lines), lines, out)
-    return func(line, lines, out)
+    functions = HEADER_FUNCTIONS if functions is None else functions
+    while line is not None:
+        if line[:1].isspace():
+            line = skip_section(lines)
+            continue
+        if line.startswith('//'):
+            return next(lines, None)
+        tokens = line.split(None, 1)
+        func = functions.get(tokens[0]) if tokens else None
+        if func is None:
+            line = skip_section(lines)
+        else:
+            line = func(line, lines, out)
+    return None
+
+
+def skip_section(lines):
+    '''
+    Skip the indented lines of a section nobody asked for, returning the next
+    line which starts in the first column, or None at the end of the lines.
+    '''
+    for line in lines:
+        if not line[:1].isspace():
+            return line
+    return None
 
 
 def parse_features(line, lines, out):
     'Parse features from lines, appending to out dict'
     out['features'] = list()
-    line, lines, out = recurse_features(next(lines), lines, out)
-    return recurse_headers(line, lines, out)
+    return parse_feature_lines(next(lines, None), lines, out)
 
 
 def parse_origin(line, lines, out):
     out['origin'] = ''
-    line, lines, out = recurse_origin(next(lines), lines, out)
-    return recurse_headers(line, lines, out)
+    return parse_origin_lines(next(lines, None), lines, out)
+
 
 def parse_locus(line, lines, out):
-    'Call locus parser, return iterator to main thread'
-    out = locus.parse(line, out)
-    return recurse_headers(next(lines), lines, out)
+    'Call locus parser, return the next line to the main loop'
+    locus.parse(line, out)
+    return next(lines, None)
 
 
 HEADER_FUNCTIONS = {
@@ -54,22 +74,41 @@ HEADER_FUNCTIONS = {
 }
 
 
-def safe_file(open_file):
-    'Reopen file with U for universal newlines, return a generator'
-    with tempfile.NamedTemporaryFile() as tmp:
-        tmp.write(open_file.read())
-        with open(tmp.name, 'U') as safe_tmp:
-            for line in safe_tmp:
-                yield line
+def select_functions(sections):
+    'Pick the HEADER_FUNCTIONS for the sections asked for, None for all'
+    if sections is None:
+        return HEADER_FUNCTIONS
+    unknown = set(sections).difference(HEADER_FUNCTIONS)
+    if unknown:
+        msg = 'Cannot parse GenBank sections {0}, choose from {1}'.format(
+            sorted(unknown), sorted(HEADER_FUNCTIONS))
+        raise ValueError(msg)
+    return {name: HEADER_FUNCTIONS[name] for name in sections}
 
 
-def init(open_file, default=None):
-    'Parse an open GenBank file to a dict, init for recursion'
-    # lines = safe_file(open_file)
-    lines = iter(open_file.readlines())
+def init(open_file, default=None, sections=None):
+    '''
+    Parse the first record of an open GenBank file to a dict. Pass a
+    collection of HEADER_FUNCTIONS keys as sections to parse only those,
+    skipping every other line unread.
+    '''
+    functions = select_functions(sections)
+    lines = iter_lines(open_file)
     out = dict()
-    try:
-        # Trust good old call-by-reference to do the job
-        recurse_headers(next(lines), lines, out)
-    except StopIteration:
-        return out
+    parse_headers(next(lines, None), lines, out, functions)
+    return out
+
+
+def iter_records(open_file, sections=None):
+    '''
+    Parse an open GenBank file lazily, yielding a dict for each LOCUS ... //
+    block. Only the record being parsed is held in memory.
+    '''
+    functions = select_functions(sections)
+    lines = iter_lines(open_file)
+    line = next(lines, None)
+    while line is not None:
+        out = dict()
+        line = parse_headers(line, lines, out, functions)
+        if out:
+            yield out
@@ -1,13 +1,42 @@
 import string
 from dgparse import sequtils
+from dgparse.exc import ParserException
 
-def recurse_origin(line, lines, out):
-    columns = line.split()
-    if not columns:
-        return recurse_origin(next(lines), lines, out)
-    bases = ''.join(map(string.upper, columns[1:]))
-    if columns[0] == '//' or (not columns[0].isdigit() and not set(bases).issubset(sequtils.AMBIG_CHAR)):
-        return line, lines, out
-    else:
-        out['origin'] = ''.join([out['origin'], bases])
-        return recurse_origin(next(lines), lines, out)
+# ORIGIN lines are decoded with translate: upper case the bases and delete
+# the coordinate column and spacing in a single pass per line
+UPPER_CASE = string.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+NOT_BASES = string.digits + string.whitespace
+IUPAC_BASES = str(''.join(sorted(sequtils.AMBIG_CHAR)))
+
+
+def parse_origin_lines(line, lines, out):
+    'Decode ORIGIN sequence lines into out, return the first line after them'
+    buf = bytearray(out['origin'])
+    while line is not None:
+        if isinstance(line, unicode):
+            line = line.encode('ascii', 'replace')
+        head = line.lstrip()[:1]
+        if head.isdigit():
+            buf.extend(line.translate(UPPER_CASE, NOT_BASES))
+        elif head:
+            # An unnumbered line only continues ORIGIN if it is all sequence
+            bases = line.translate(UPPER_CASE, NOT_BASES)
+            if head == '/' or bases.translate(None, IUPAC_BASES):
+                break
+            buf.extend(bases)
+        line = next(lines, None)
+    out['origin'] = str(buf)
+    return line
+
+
+def check_bases(bases):
+    '''
+    Validate the decoded ORIGIN against the IUPAC alphabet in one pass. Not
+    done by default, as numbered lines may hold other symbols such as gaps.
+    '''
+    if bases.translate(None, IUPAC_BASES):
+        hit = sequtils.NOT_DNA.search(bases)
+        msg = "Non-IUPAC DNA base '{0}' found in ORIGIN at {1}".format(
+            hit.group(), hit.start())
+        raise ParserException(msg)
+    return bases
@@ -0,0 +1,129 @@
+# encoding=utf-8
+"""
+Lazily materialized dnafeature annotations.
+
+genbank.parse(open_file, lazy=True) fills dnafeatures with FeatureViews. They
+answer lookups, iteration and comparison exactly like the dicts built in the
+default mode, but each is only built from its parsed feature when first
+used, and the pattern bases, their sha1 and the feature length are only
+computed the first time they are looked up. Parsing a record whose
+annotations are mostly never read then costs little beyond the line parsing.
+"""
+import collections
+import hashlib
+
+
+class LazyMapping(collections.MutableMapping):
+    """
+    A dict-like object whose lazy_keys are computed by its compute_<key>
+    method on first access and cached from then on.
+    """
+    lazy_keys = ()
+
+    def __init__(self, values):
+        self.values = values
+
+    def __getitem__(self, key):
+        try:
+            return self.values[key]
+        except KeyError:
+            if key not in self.lazy_keys:
+                raise
+        value = self.values[key] = getattr(self, 'compute_' + key)()
+        return value
+
+    def __setitem__(self, key, value):
+        self.values[key] = value
+
+    def __delitem__(self, key):
+        if key in self.lazy_keys:
+            self.lazy_keys = tuple(k for k in self.lazy_keys if k != key)
+            self.values.pop(key, None)
+        else:
+            del self.values[key]
+
+    def __iter__(self):
+        keys = list(self.values)
+        keys.extend(key for key in self.lazy_keys if key not in self.values)
+        return iter(keys)
+
+    def __len__(self):
+        return len(self.values) + sum(1 for key in self.lazy_keys
+                                      if key not in self.values)
+
+    def __contains__(self, key):
+        return key in self.values or key in self.lazy_keys
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.values)
+
+    def is_pending(self, key):
+        """True while the value for a lazy key has not been computed"""
+        return key in self.lazy_keys and key not in self.values
+
+
+class PatternView(LazyMapping):
+    """The bases of a feature and their sha1, extracted on demand"""
+    lazy_keys = ('bases', 'sha1')
+
+    def __init__(self, span):
+        self.values = {}
+        self.span = span
+
+    def compute_bases(self):
+        return self.span.extract()
+
+    def compute_sha1(self):
+        return hashlib.sha1(self['bases']).hexdigest()
+
+
+class DnaFeatureView(LazyMapping):
+    """
+    A dnafeature whose length and pattern are computed on demand from its
+    span, any object providing extract() and length().
+    """
+    lazy_keys = ('length', 'pattern')
+
+    def __init__(self, values, span):
+        self.values = values
+        self.span = span
+
+    def compute_length(self):
+        return self.span.length()
+
+    def compute_pattern(self):
+        return PatternView(self.span)
+
+
+class FeatureView(LazyMapping):
+    """
+    A dnafeature annotation of a molecule holding a DnaFeatureView. Nothing
+    but its arguments is kept until it is first used, when the annotation is
+    built by build(context, feature).
+    """
+
+    def __init__(self, build, context, feature):
+        self.build = build
+        self.context = context
+        self.feature = feature
+        self.annotation = None
+
+    @property
+    def values(self):
+        if self.annotation is None:
+            self.annotation = self.build(self.context, self.feature)
+            self.build = self.context = self.feature = None
+        return self.annotation
+
+    def is_built(self):
+        """True once the annotation has been built"""
+        return self.annotation is not None
+
+
+def materialize(obj):
+    """Recursively convert views to plain dicts, e.g. to serialize them"""
+    if isinstance(obj, collections.Mapping):
+        return {key: materialize(value) for key, value in obj.iteritems()}
+    if isinstance(obj, list):
+        return [materialize(item) for item in obj]
+    return obj
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+A buffered line source shared by the text parsers.
+
+Uploads arrive with Unix, Windows or classic Mac (CR only) line endings.
+Rather than copying each upload to disk and reopening it in universal
+newline mode, read it in large blocks, normalize every line ending to \\n
+and yield the lines one at a time.
+"""
+from __future__ import division
+from __future__ import absolute_import
+
+BLOCK_SIZE = 1 << 20
+
+
+def iter_lines(open_file, block_size=BLOCK_SIZE):
+    """
+    Lazily yield the lines of an open file, each ending in \\n whether the
+    file used \\r\\n, \\r or \\n. A last line with no line ending is
+    yielded as it is, without one. Only one block, and the pieces of a line
+    spanning several, is held in memory at a time; each line is joined once.
+    """
+    pending = []  # pieces of a line continuing into the next block
+    split_crlf = False
+    while True:
+        block = open_file.read(block_size)
+        if not block:
+            break
+        if split_crlf and block.startswith('\n'):
+            block = block[1:]  # the second half of a \r\n split across blocks
+        split_crlf = block.endswith('\r')
+        if '\r' in block:
+            block = block.replace('\r\n', '\n').replace('\r', '\n')
+        lines = block.splitlines(True)
+        if not lines:
+            continue
+        if pending:
+            pending.append(lines[0])
+            if not lines[0].endswith('\n'):
+                continue
+            lines[0] = ''.join(pending)
+            pending = []
+        if not lines[-1].endswith('\n'):
+            pending = [lines.pop()]
+        for line in lines:
+            yield line
+    if pending:
+        yield ''.join(pending)
@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Find the off-targets of CRISPR guides in a reference of molecules.
+
+The reference, e.g. a set of parsed plasmids or the records of a FASTA
+file, is held as one array of base codes (sequtils.encode_bases). Its
+forward strand is indexed by seed: every k-mer position, grouped by k-mer
+in compressed sparse row form, positions[offsets[kmer]:offsets[kmer + 1]].
+A guide matching with at most m mismatches matches one of its m + 1
+segments exactly (the pigeonhole principle), so the positions of the first
+k bases of each segment are its candidate sites. The guide and its reverse
+complement are both looked up, for sites on either strand.
+
+With the default 4 base seeds, for 20 base guides with up to 4
+mismatches, each seed's bucket holds about one in 256 positions of the
+reference, so the candidates verified per guide grow linearly with it.
+That suits plasmids and collections of them up to a few megabases. For
+larger references build with a longer seed_length, which limits the
+mismatches found to len(guide) // seed_length - 1.
+
+The reference is also packed two bits a base, 32 bases to a uint64, so the
+window of a candidate is read from two words with a shift, xored with the
+packed guide, and its differing pairs of bits counted, for every candidate
+at once. Ambiguous reference bases always count as mismatches.
+
+An index is saved as .npy files in a directory, and loaded with mmap, so
+scoring batches of guides against a large reference neither rebuilds nor
+reads in the whole index.
+"""
+from __future__ import absolute_import
+from __future__ import division
+
+import collections
+import json
+import os
+
+import numpy as np
+
+from dgparse import crispr
+from dgparse import sequtils
+
+SEED_LENGTH = 4  # 20 mers with up to 4 mismatches have 4 base segments
+MAX_MISMATCHES = 4
+PAD = 40  # bases repeated either side of the origin of circular molecules
+PACK_ROWS = 1 << 16  # words packed at a time
+ARRAYS = ('codes', 'words', 'ambiguous', 'positions', 'offsets', 'molecules')
+
+# The off-target hit weights of Hsu et al. 2013 (the MIT score), for each
+# position of a 20 base protospacer, PAM distal first
+MIT_WEIGHTS = np.array([0, 0, 0.014, 0, 0, 0.395, 0.317, 0, 0.389, 0.079,
+                        0.445, 0.508, 0.613, 0.851, 0.732, 0.828, 0.615,
+                        0.804, 0.685, 0.583])
+
+LOW_BITS = np.uint64(0x5555555555555555)
+PAIRS = np.uint64(0x3333333333333333)
+NIBBLES = np.uint64(0x0f0f0f0f0f0f0f0f)
+BYTES = np.uint64(0x0101010101010101)
+
+OffTarget = collections.namedtuple(
+    'OffTarget', 'molecule start end strand mismatches positions')
+
+
+def pack(codes):
+    """
+    Pack rows of at most 32 base codes into uint64s, two bits a base from
+    the highest, and flag the ambiguous ones in the low bit of their pair
+    """
+    shifts = np.arange(62, 62 - 2 * codes.shape[-1], -2, dtype=np.uint64)
+    codes = codes.astype(np.uint64)
+    words = np.bitwise_or.reduce((codes & np.uint64(3)) << shifts, axis=-1)
+    ambiguous = np.bitwise_or.reduce(
+        (codes >> np.uint64(2)) << shifts, axis=-1)
+    return words, ambiguous
+
+
+def pack_reference(codes):
+    """
+    The base codes packed 32 to a uint64, and their ambiguous bases, with a
+    word of padding so any window can be read from two words
+    """
+    padded = np.zeros((len(codes) // 32 + 2) * 32, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    padded = padded.reshape(-1, 32)
+    words = np.zeros(len(padded), dtype=np.uint64)
+    ambiguous = np.zeros(len(padded), dtype=np.uint64)
+    for start in range(0, len(padded), PACK_ROWS):
+        rows = slice(start, start + PACK_ROWS)
+        words[rows], ambiguous[rows] = pack(padded[rows])
+    return words, ambiguous
+
+
+def windows(words, starts, size):
+    """The packed windows of size bases at starts, from packed words"""
+    index = starts // 32
+    shift = (2 * (starts % 32)).astype(np.uint64)
+    # the low part is shifted twice, as a shift by 64 bits is undefined
+    window = (words[index] << shift) | \
+        ((words[index + 1] >> np.uint64(1)) >> (np.uint64(63) - shift))
+    return window >> np.uint64(64 - 2 * size) << np.uint64(64 - 2 * size)
+
+
+def hamming(words, ambiguous, word):
+    """The number of bases in which each packed row differs from word"""
+    differ = words ^ word
+    differ = ((differ | (differ >> np.uint64(1))) & LOW_BITS) | \
+        np.uint64(ambiguous)
+    # count the set bits, summing pairs, nibbles, then the bytes
+    differ = (differ & PAIRS) + ((differ >> np.uint64(2)) & PAIRS)
+    differ = (differ + (differ >> np.uint64(4))) & NIBBLES
+    return ((differ * BYTES) >> np.uint64(56)).astype(np.int64)
+
+
+def kmer_codes(codes, k):
+    """
+    The k-mer starting at each position of the base codes as an integer,
+    and whether it is all ACGT
+    """
+    positions = len(codes) - k + 1
+    kmers = np.zeros(max(positions, 0), dtype=np.int64)
+    valid = np.ones(max(positions, 0), dtype=bool)
+    for offset in range(k):
+        window = codes[offset:offset + positions]
+        kmers = (kmers << 2) | (window & 3)
+        valid &= window < sequtils.INVALID_BASE
+    return kmers, valid
+
+
+def mit_score(positions):
+    """
+    The MIT score of one off-target, 0 to 100, from the positions of its
+    mismatches in a 20 base protospacer, PAM distal first
+    """
+    count = len(positions)
+    if not count:
+        return 100.0
+    score = np.prod(1 - MIT_WEIGHTS[list(positions)])
+    if count > 1:
+        mean_distance = (max(positions) - min(positions)) / (count - 1)
+        score /= ((19 - mean_distance) / 19) * 4 + 1
+    return 100 * score / count ** 2
+
+
+def is_site(hit, site):
+    """
+    Whether an OffTarget is the perfect match at site, a (molecule, start,
+    strand) tuple, any molecule matching a molecule of None
+    """
+    molecule, start, strand = site
+    return hit.mismatches == 0 and (hit.start, hit.strand) == (start, strand) \
+        and molecule in (None, hit.molecule)
+
+
+def specificity_score(offtargets, site=None):
+    """
+    The aggregate MIT specificity of a 20 base guide from its off-targets,
+    100 for a guide with none. The guide's own site, given as a (molecule,
+    start, strand) tuple, is not counted. Other perfect matches are.
+    """
+    scores = [mit_score(hit.positions) for hit in offtargets]
+    for index, hit in enumerate(offtargets):
+        if site is not None and is_site(hit, site):
+            del scores[index]
+            break
+    return 100 * 100 / (100 + sum(scores))
+
+
+class OffTargetIndex(object):
+    """
+    A seed index of a reference of molecules. molecules is a structured
+    array of the start of each molecule in codes, how many of its bases
+    are repeated before it, its length, and names the name of each.
+    """
+
+    def __init__(self, codes, words, ambiguous, positions, offsets,
+                 molecules, names, seed_length=SEED_LENGTH):
+        self.codes = codes
+        self.words = words
+        self.ambiguous = ambiguous
+        self.positions = positions
+        self.offsets = offsets
+        self.molecules = molecules
+        self.names = names
+        self.seed_length = seed_length
+        # where each molecule's padded bases end
+        self.ends = molecules['start'] + molecules['length'] + \
+            2 * molecules['pad']
+
+    @classmethod
+    def build(cls, molecules, seed_length=SEED_LENGTH):
+        """
+        Index (name, bases, is_circular) molecules. Circular molecules are
+        stored with PAD bases from across the origin either side.
+        """
+        chunks, rows, names = [], [], []
+        start = 0
+        for name, bases, is_circular in molecules:
+            codes = sequtils.encode_bases(bases)
+            length = len(codes)
+            pad = min(PAD, length) if is_circular else 0
+            if pad:
+                codes = np.concatenate((codes[length - pad:], codes,
+                                        codes[:pad]))
+            chunks.append(codes)
+            rows.append((start, pad, length))
+            names.append(name)
+            start += len(codes)
+        codes = np.concatenate(chunks) if chunks else \
+            np.zeros(0, dtype=np.uint8)
+        kmers, valid = kmer_codes(codes, seed_length)
+        seeds = np.flatnonzero(valid)
+        order = np.argsort(kmers[seeds], kind='mergesort')
+        dtype = np.uint32 if len(codes) < 1 << 32 else np.int64
+        positions = seeds[order].astype(dtype)
+        counts = np.bincount(kmers[seeds], minlength=4 ** seed_length)
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        molecules = np.array(rows, dtype=[(b'start', np.int64),
+                                          (b'pad', np.int64),
+                                          (b'length', np.int64)])
+        words, ambiguous = pack_reference(codes)
+        return cls(codes, words, ambiguous, positions, offsets, molecules,
+                   names, seed_length)
+
+    @classmethod
+    def from_records(cls, records, seed_length=SEED_LENGTH):
+        """
+        Index parsed molecule records, e.g. those of genbank.parse or
+        fasta.parse_fasta.iter_fasta
+        """
+        def molecules():
+            for record in records:
+                yield (record.get('name'), sequtils.record_bases(record),
+                       record.get('is_circular', False))
+        return cls.build(molecules(), seed_length)
+
+    def save(self, directory):
+        """Save the index as .npy files in a directory"""
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, name + '.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'index.json'), 'w') as meta:
+            json.dump({'names': self.names, 'seed_length': self.seed_length},
+                      meta)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Load an index saved with save(), memory mapping its arrays"""
+        with open(os.path.join(directory, 'index.json')) as meta:
+            meta = json.load(meta)
+        arrays = [np.load(os.path.join(directory, name + '.npy'),
+                          mmap_mode=mmap_mode) for name in ARRAYS]
+        return cls(*arrays, names=meta['names'],
+                   seed_length=meta['seed_length'])
+
+    def candidates(self, query, mismatches):
+        """The start positions of the sites sharing a seed with the query"""
+        segment = len(query) // (mismatches + 1)
+        if segment < self.seed_length:
+            raise ValueError("Cannot find {0} base guides with {1} mismatches "
+                             "with seeds of {2}".format(len(query), mismatches,
+                                                        self.seed_length))
+        kmers, valid = kmer_codes(query, self.seed_length)
+        found = []
+        for offset in range(0, segment * (mismatches + 1), segment):
+            if not valid[offset]:
+                continue  # an ambiguous seed, covered by the others
+            kmer = kmers[offset]
+            seeds = self.positions[self.offsets[kmer]:self.offsets[kmer + 1]]
+            found.append(seeds.astype(np.int64) - offset)
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(found)  # sites sharing seeds repeat
+
+    def find(self, guide, mismatches=MAX_MISMATCHES, pam=None,
+             pam_3prime=True):
+        """
+        The sites of the reference matching guide, a protospacer of at most
+        32 bases, with at most the given number of mismatches on either
+        strand, next to pam if given. OffTarget.positions are those of the
+        mismatches in the guide. Coordinates are those of the site in its
+        molecule, as for dnafeatures.
+        """
+        guide = str(guide).upper()
+        if len(guide) > 32:
+            raise ValueError("Guides are limited to 32 bases")
+        pam = str(pam or '').upper()
+        hits = []
+        for strand in (1, -1):
+            query = guide if strand > 0 else \
+                sequtils.get_reverse_complement(guide)
+            site_pam = pam if strand > 0 else \
+                sequtils.get_reverse_complement(pam)
+            hits.extend(self.verify(query, strand, site_pam,
+                                    (strand > 0) == pam_3prime, mismatches))
+        return hits
+
+    def verify(self, query, strand, pam, pam_after, mismatches):
+        """
+        The candidate sites of a query on one strand, verified, with pam
+        after or before them on the forward strand
+        """
+        query_codes = sequtils.encode_bases(query)
+        starts = self.candidates(query_codes, mismatches)
+        size = len(query)
+        before = 0 if pam_after else len(pam)
+        after = len(pam) if pam_after else 0
+        starts = starts[(starts >= before) &
+                        (starts + size + after <= len(self.codes))]
+        word, _ = pack(query_codes)
+        distance = hamming(windows(self.words, starts, size), 0, word)
+        # ambiguous bases only add mismatches, so are read for the closest
+        starts = np.unique(starts[distance <= mismatches])
+        distance = hamming(windows(self.words, starts, size),
+                           windows(self.ambiguous, starts, size), word)
+        starts, distance = starts[distance <= mismatches], \
+            distance[distance <= mismatches]
+        if pam:
+            pam_start = starts + size if pam_after else starts - before
+            close = np.ones(len(starts), dtype=bool)
+            for offset, code in enumerate(pam):
+                close &= crispr.allowed_codes(code)[
+                    self.codes[pam_start + offset]]
+            starts, distance = starts[close], distance[close]
+        # the site and its PAM must lie within one molecule's bases
+        molecule = np.searchsorted(self.molecules['start'], starts,
+                                   side='right') - 1
+        inside = (molecule >= 0) & (starts - before >=
+                                    self.molecules['start'][molecule])
+        inside &= starts + size + after <= self.ends[molecule]
+        starts, molecule, distance = starts[inside], molecule[inside], \
+            distance[inside]
+        sites = self.codes[starts[:, None] + np.arange(size)]
+        differ = (sites != query_codes) | (sites == sequtils.INVALID_BASE)
+        # locate the sites in their own molecules, wrapping circular ones
+        rows = self.molecules[molecule]
+        local = starts - rows['start'] - rows['pad']
+        keep = (local >= 0) & (local < rows['length'])
+        ends = (local + size - 1) % np.maximum(rows['length'], 1) + 1
+        hits = []
+        for index in np.flatnonzero(keep).tolist():
+            positions = np.flatnonzero(differ[index])
+            if strand < 0:  # in the guide, read from the other strand
+                positions = size - 1 - positions[::-1]
+            hits.append(OffTarget(self.names[molecule[index]],
+                                  int(local[index]), int(ends[index]), strand,
+                                  int(distance[index]),
+                                  tuple(positions.tolist())))
+        return hits
+
+
+def score_guides(guides, index, mismatches=MAX_MISMATCHES, molecule=None):
+    """
+    Fill in the offtargets and specificity_score of crispr.find_guides
+    dicts from an OffTargetIndex, requiring the PAM of each guide's nuclease
+    at off-target sites. Scores are only given for 20 base protospacers.
+    molecule names the indexed molecule the guides were found in; the hit
+    at each guide's start and strand there is its own site, not scored.
+    Without it, a perfect match at that start and strand in any molecule is
+    taken to be the site.
+    """
+    for guide in guides:
+        nuclease = guide.get('nuclease', {})
+        known = crispr.NUCLEASES.get(nuclease.get('name'), crispr.SPCAS9)
+        hits = index.find(guide['protospacer'], mismatches,
+                          nuclease.get('pam'), known.pam_3prime)
+        guide['offtargets'] = [{
+            'molecule_accession': hit.molecule,
+            'start': hit.start,
+            'end': hit.end,
+            'strand': hit.strand,
+            'coordinates': {'start_end': [hit.start, hit.end],
+                            'strand': hit.strand},
+            'mismatches': hit.mismatches,
+        } for hit in hits]
+        if len(guide['protospacer']) == len(MIT_WEIGHTS):
+            guide['specificity_score'] = specificity_score(
+                hits, (molecule, guide['start'], guide['strand']))
+    return guides
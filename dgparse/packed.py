@@ -0,0 +1,142 @@
+# encoding=utf-8
+"""
+A compact in-memory DNA sequence.
+
+PackedSequence stores the canonical (upper case) bases at two bits per base,
+A, C, G and T coded as in sequtils.DNA_BYTES, plus a sparse list of the
+runs of IUPAC ambiguity codes, each as its start, length and code, which are
+stored as A in the packed bases. A gap of millions of N is a single run. Slicing decodes only the bytes covering the slice and returns a str,
+so feature patterns can be extracted from a packed sequence as from a str.
+"""
+import array
+import bisect
+import binascii
+import hashlib
+import re
+import string
+
+from dgparse import sequtils
+
+# Map bases to base 4 digits, anything but ACGT to 0
+BY_BASE = dict((str(base), code) for base, code in sequtils.DNA_BYTES.iteritems())
+TO_DIGITS = b''.join(BY_BASE.get(chr(char), b'0') for char in range(256))
+
+# The four bases packed in each possible byte, first base in the high bits
+BY_CODE = dict((code, base) for base, code in BY_BASE.iteritems())
+BYTE_BASES = [b''.join(BY_CODE[str(byte >> shift & 3)]
+                       for shift in (6, 4, 2, 0)) for byte in range(256)]
+
+COMPLEMENT = string.maketrans(
+    b''.join(sequtils.ASCII_DNA_COMP), b''.join(sequtils.ASCII_DNA_COMP.values()))
+
+HASH_CHUNK = 1 << 20
+
+# A run of one repeated ambiguity code, or any other symbol
+AMBIGUOUS_RUN = re.compile(br'([^ACGT])\1*')
+
+
+def pack(bases):
+    """Pack upper case bases into bytes, four to a byte"""
+    if not bases:
+        return b''
+    digits = bases.translate(TO_DIGITS)
+    digits += b'0' * (-len(digits) % 4)
+    packed = b'%x' % int(digits, 4)
+    return binascii.unhexlify(packed.zfill(len(digits) // 2))
+
+
+class PackedSequence(object):
+    """
+    DNA bases held at two bits per base. len(), slicing, str(), sha1 and
+    reverse_complement() all work on the canonical upper case bases.
+    """
+    __slots__ = ('data', 'length', 'starts', 'lengths', 'codes')
+
+    def __init__(self, bases):
+        if isinstance(bases, unicode):
+            bases = bases.encode('ascii')
+        bases = bases.translate(sequtils.UPPER_CASE)
+        self.length = len(bases)
+        self.data = pack(bases)
+        self.starts = array.array(b'L')
+        self.lengths = array.array(b'L')
+        codes = []
+        if bases.translate(None, b'ACGT'):
+            for hit in AMBIGUOUS_RUN.finditer(bases):
+                self.starts.append(hit.start())
+                self.lengths.append(hit.end() - hit.start())
+                codes.append(hit.group(1))
+        self.codes = b''.join(codes)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                return str(self)[key]
+            return self.decode(start, max(start, stop))
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError('PackedSequence index out of range')
+        return self.decode(key, key + 1)
+
+    def decode(self, start, stop):
+        """Unpack the bases [start, stop)"""
+        data = self.data[start // 4:(stop + 3) // 4]
+        bases = b''.join([BYTE_BASES[byte] for byte in bytearray(data)])
+        bases = bases[start % 4:start % 4 + stop - start]
+        # the runs starting before stop, from the last starting by start
+        first = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        last = bisect.bisect_left(self.starts, stop)
+        runs = [(max(self.starts[index], start),
+                 min(self.starts[index] + self.lengths[index], stop),
+                 self.codes[index]) for index in range(first, last)]
+        runs = [(begin, end, code) for begin, end, code in runs if begin < end]
+        if not runs:
+            return bases
+        bases = bytearray(bases)
+        for begin, end, code in runs:
+            bases[begin - start:end - start] = code * (end - begin)
+        return str(bases)
+
+    def __str__(self):
+        return self.decode(0, self.length)
+
+    def __repr__(self):
+        return '<PackedSequence {0} bases>'.format(self.length)
+
+    def __eq__(self, other):
+        if isinstance(other, PackedSequence):
+            return (self.length, self.data, self.starts, self.lengths,
+                    self.codes) == (other.length, other.data, other.starts,
+                                    other.lengths, other.codes)
+        if isinstance(other, basestring):
+            return str(self) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None  # equal to str, so cannot hash like one cheaply
+
+    def sha1(self):
+        """The sha1 hex digest of the bases, decoded a chunk at a time"""
+        digest = hashlib.sha1()
+        for start in range(0, self.length, HASH_CHUNK):
+            digest.update(self.decode(start, min(start + HASH_CHUNK,
+                                                 self.length)))
+        return digest.hexdigest()
+
+    def reverse_complement(self):
+        """A new PackedSequence holding the reverse complement"""
+        return PackedSequence(str(self).translate(COMPLEMENT)[::-1])
+
+    def nbytes(self):
+        """Approximate memory held by the packed bases and ambiguity runs"""
+        return len(self.data) + len(self.codes) + \
+            self.starts.itemsize * len(self.starts) + \
+            self.lengths.itemsize * len(self.lengths)
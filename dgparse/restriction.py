@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Find the restriction sites of a catalogue of enzymes in a molecule.
+
+The recognition sites of the whole catalogue are compiled into one
+search.Matcher, so a molecule is scanned once on both strands however many
+enzymes there are. Cut positions are given as offsets from the first base
+of the recognition site on the strand it is read from, as in REBASE: EcoRI,
+G^AATTC, cuts its top strand after 1 base and the bottom after 5, leaving
+a 4 base 5' overhang. Type IIS enzymes cut outside their site, e.g. BsaI,
+GGTCTC(1/5), cuts after 7 and 11.
+"""
+from __future__ import absolute_import
+
+import collections
+
+from dgparse import search
+from dgparse import sequtils
+
+Enzyme = collections.namedtuple('Enzyme', 'name site topcut btmcut')
+
+# Common commercially available Type II enzymes
+ENZYMES = (
+    Enzyme('AatII', 'GACGTC', 5, 1),
+    Enzyme('AccI', 'GTMKAC', 2, 4),
+    Enzyme('AflII', 'CTTAAG', 1, 5),
+    Enzyme('AgeI', 'ACCGGT', 1, 5),
+    Enzyme('AlwNI', 'CAGNNNCTG', 6, 3),
+    Enzyme('ApaI', 'GGGCCC', 5, 1),
+    Enzyme('AscI', 'GGCGCGCC', 2, 6),
+    Enzyme('AvrII', 'CCTAGG', 1, 5),
+    Enzyme('BamHI', 'GGATCC', 1, 5),
+    Enzyme('BbsI', 'GAAGAC', 8, 12),
+    Enzyme('BglI', 'GCCNNNNNGGC', 7, 4),
+    Enzyme('BglII', 'AGATCT', 1, 5),
+    Enzyme('BsaI', 'GGTCTC', 7, 11),
+    Enzyme('BsmBI', 'CGTCTC', 7, 11),
+    Enzyme('BsrGI', 'TGTACA', 1, 5),
+    Enzyme('BstXI', 'CCANNNNNNTGG', 8, 4),
+    Enzyme('ClaI', 'ATCGAT', 2, 4),
+    Enzyme('DraI', 'TTTAAA', 3, 3),
+    Enzyme('EagI', 'CGGCCG', 1, 5),
+    Enzyme('EcoRI', 'GAATTC', 1, 5),
+    Enzyme('EcoRV', 'GATATC', 3, 3),
+    Enzyme('FseI', 'GGCCGGCC', 6, 2),
+    Enzyme('HindIII', 'AAGCTT', 1, 5),
+    Enzyme('HpaI', 'GTTAAC', 3, 3),
+    Enzyme('KpnI', 'GGTACC', 5, 1),
+    Enzyme('MluI', 'ACGCGT', 1, 5),
+    Enzyme('NcoI', 'CCATGG', 1, 5),
+    Enzyme('NdeI', 'CATATG', 2, 4),
+    Enzyme('NheI', 'GCTAGC', 1, 5),
+    Enzyme('NotI', 'GCGGCCGC', 2, 6),
+    Enzyme('NsiI', 'ATGCAT', 5, 1),
+    Enzyme('PacI', 'TTAATTAA', 5, 3),
+    Enzyme('PmeI', 'GTTTAAAC', 4, 4),
+    Enzyme('PstI', 'CTGCAG', 5, 1),
+    Enzyme('PvuI', 'CGATCG', 4, 2),
+    Enzyme('PvuII', 'CAGCTG', 3, 3),
+    Enzyme('SacI', 'GAGCTC', 5, 1),
+    Enzyme('SacII', 'CCGCGG', 4, 2),
+    Enzyme('SalI', 'GTCGAC', 1, 5),
+    Enzyme('SapI', 'GCTCTTC', 8, 11),
+    Enzyme('SbfI', 'CCTGCAGG', 6, 2),
+    Enzyme('ScaI', 'AGTACT', 3, 3),
+    Enzyme('SfiI', 'GGCCNNNNNGGCC', 8, 5),
+    Enzyme('SmaI', 'CCCGGG', 3, 3),
+    Enzyme('SpeI', 'ACTAGT', 1, 5),
+    Enzyme('SphI', 'GCATGC', 5, 1),
+    Enzyme('StuI', 'AGGCCT', 3, 3),
+    Enzyme('XbaI', 'TCTAGA', 1, 5),
+    Enzyme('XhoI', 'CTCGAG', 1, 5),
+    Enzyme('XmaI', 'CCCGGG', 1, 5),
+)
+
+
+def make_nuclease(enzyme):
+    """The nuclease of a restriction site, after BaseRestrictionEnzymeSchema"""
+    return {
+        'name': enzyme.name,
+        'category': 'restrictionenzyme',
+        'site': enzyme.site,
+        'topcut': enzyme.topcut,
+        'btmcut': enzyme.btmcut,
+        'overhang': enzyme.btmcut - enzyme.topcut,  # < 0 for 3' overhangs
+    }
+
+
+class Catalogue(object):
+    """
+    A set of restriction enzymes compiled for finding their sites. Takes
+    Enzymes or (name, site, topcut, btmcut) tuples.
+    """
+
+    def __init__(self, enzymes=ENZYMES):
+        self.enzymes = [Enzyme(*enzyme) for enzyme in enzymes]
+        self.matcher = search.Matcher(
+            [enzyme.site for enzyme in self.enzymes])
+
+    def find(self, bases, is_circular=False):
+        """
+        The restriction sites in a molecule, in the shape of dnafeatures
+        with the nuclease in place of the dnafeature. topcut and btmcut are
+        the cut positions in the top and bottom strands of the molecule,
+        counted like start and end. On a linear molecule sites which would
+        be cut outside it are left out.
+        """
+        length = len(bases)
+        sites = []
+        for hit in self.matcher.find(bases, is_circular):
+            enzyme = self.enzymes[hit.pattern]
+            if hit.strand > 0:
+                topcut = hit.start + enzyme.topcut
+                btmcut = hit.start + enzyme.btmcut
+            else:  # read from the bottom strand, so cut mirrored
+                site_end = hit.start + len(enzyme.site)
+                topcut = site_end - enzyme.btmcut
+                btmcut = site_end - enzyme.topcut
+            if is_circular:
+                topcut, btmcut = topcut % length, btmcut % length
+            elif not (0 < topcut < length and 0 < btmcut < length):
+                continue
+            sites.append({
+                'start': hit.start,
+                'end': hit.end,
+                'strand': hit.strand,
+                'topcut': topcut,
+                'btmcut': btmcut,
+                'nuclease': make_nuclease(enzyme),
+            })
+        return sites
+
+    def digest(self, bases, is_circular=False):
+        """
+        The restriction sites of a molecule, and the names of the enzymes
+        which cut it once and not at all.
+        """
+        sites = self.find(bases, is_circular)
+        counts = collections.Counter(site['nuclease']['name']
+                                     for site in sites)
+        names = [enzyme.name for enzyme in self.enzymes]
+        return {
+            'restrictionsites': sites,
+            'unique_cutters': [name for name in names if counts[name] == 1],
+            'noncutters': [name for name in names if not counts[name]],
+        }
+
+
+def digest_record(record, catalogue):
+    """
+    Add the restriction sites of a parsed molecule record, and its unique
+    and non cutters, to the record. Records without bases are left alone.
+    """
+    bases = sequtils.record_bases(record)
+    if bases:
+        record.update(catalogue.digest(bases, record.get('is_circular', False)))
+    return record
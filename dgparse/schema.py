@@ -25,6 +25,7 @@ from marshmallow import Schema, fields, pre_load, validates, pre_dump
 
 from dgparse import exc
 from dgparse.sequtils import NOT_UNAMBIG_DNA, NOT_DNA, compute_sha1, MOD_CHAR
+from dgparse.sequtils import canonical_sha1
 # Start with the primitives and simple elements then build up
 
 class SequenceSchema(Schema):
@@ -36,6 +37,7 @@ class SequenceSchema(Schema):
     altered provided the same interface is supported.
     """
     sha1 = fields.String(load_only=True)
+    canonical_sha1 = fields.String(load_only=True)  # of circular sequences
     alphabet = fields.String(default=b'ACGT', load_only=True)  # Must be in lexographic order  NOQA
     bases = fields.String()  # really a property
 
@@ -212,6 +214,22 @@ class BaseMoleculeSchema(BaseRecordSchema):
             data['length'] = None
         return data
 
+    @pre_load
+    def compute_canonical_sha1(self, data):
+        """
+        Hash the canonical rotation of a circular sequence if not provided,
+        so the same molecule numbered from a different origin matches. Only
+        done when asked for, with context={'canonical_sha1': True}.
+        """
+        if not self.context.get('canonical_sha1'):
+            return data
+        is_circular = data.get('is_circular', self.fields['is_circular'].default)
+        sequence = data.get('sequence')
+        if is_circular and isinstance(sequence, dict) and \
+                sequence.get('bases') and 'canonical_sha1' not in sequence:
+            sequence['canonical_sha1'] = canonical_sha1(sequence['bases'])
+        return data
+
 
 class DnaMoleculeFileSchema(Schema):
     """An accessory data file for a DNA Molecule"""
@@ -559,6 +577,10 @@ class BaseRestrictionEnzymeSchema(NucleaseSchema):
     """
     A Type II restriction endonuclease enzyme
     """
+    site = fields.String()  # the recognition site, may be degenerate
+    topcut = fields.Integer()  # offsets from the start of the site
+    btmcut = fields.Integer()
+    overhang = fields.Integer()  # negative for 3' overhangs
 
 
 class BaseExperimentItemSchema(BaseRecordSchema):
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Search for degenerate DNA motifs, e.g. restriction sites, PAMs or primers
+written with IUPAC ambiguity codes, allowing a bounded number of mismatches.
+
+This is the bit-parallel Shift-And algorithm. Each position of a pattern is
+a bit, and each character of the sequence has a mask of the positions it
+matches, so the state of every partial match advances with a shift, an or
+and an and per base. Several patterns, and the reverse complement of each,
+are laid end to end in one state, so one scan finds them all on both
+strands. With k mismatches allowed there are k + 1 states, the d-th
+holding the partial matches with at most d mismatches.
+
+A base of the sequence matches a position of a pattern when every base it
+stands for is allowed there, so N in a pattern matches anything and N in a
+sequence only matches N.
+"""
+from __future__ import absolute_import
+
+import collections
+
+from dgparse import exc
+from dgparse import sequtils
+
+# the bases each IUPAC code stands for, in both cases
+IUPAC_BASES = dict((base, set(base)) for base in 'ACGT')
+IUPAC_BASES.update((code, set(bases)) for code, bases in
+                   sequtils.AMBIGUOUS_CODES.iteritems())
+IUPAC_BASES['X'] = IUPAC_BASES['N']
+IUPAC_BASES.update([(code.lower(), bases) for code, bases in
+                    IUPAC_BASES.items()])
+
+Hit = collections.namedtuple('Hit', 'start end strand pattern mismatches')
+
+
+class Matcher(object):
+    """
+    A set of degenerate patterns compiled for searching both strands of a
+    sequence with at most the given number of mismatches each.
+    """
+
+    def __init__(self, patterns, mismatches=0):
+        patterns = [str(pattern) for pattern in patterns]
+        for pattern in patterns:
+            illegal = sequtils.NOT_DNA.search(pattern)
+            if illegal:
+                raise exc.IllegalCharacter(
+                    "Non-IUPAC DNA base found at {0}".format(illegal.start()))
+            if len(pattern) <= mismatches:
+                raise ValueError("Pattern {0} is no longer than {1} "
+                                 "mismatches".format(pattern, mismatches))
+        self.patterns = patterns
+        self.mismatches = mismatches
+        self.masks = dict((chr(char), 0) for char in range(256))
+        self.first = 0  # the bit of the first position of each pattern
+        self.last = 0  # the bit of the last position of each pattern
+        self.ends = {}  # which pattern ends at each last bit
+        self.max_length = 0
+        offset = 0
+        for index, pattern in enumerate(patterns):
+            reverse = sequtils.get_reverse_complement(pattern)
+            strands = [(pattern, 1)]
+            if reverse.upper() != pattern.upper():  # palindromes once
+                strands.append((reverse, -1))
+            for bases, strand in strands:
+                self.add(bases, offset)
+                self.first |= 1 << offset
+                offset += len(bases)
+                self.last |= 1 << offset - 1
+                self.ends[1 << offset - 1] = (len(bases), strand, index)
+            self.max_length = max(self.max_length, len(pattern))
+
+    def add(self, pattern, offset):
+        """Set the bits of a pattern starting at offset in the masks"""
+        for position, code in enumerate(pattern):
+            allowed = IUPAC_BASES[code]
+            bit = 1 << offset + position
+            for char, bases in IUPAC_BASES.iteritems():
+                if bases <= allowed:
+                    self.masks[char] |= bit
+
+    def scan(self, bases):
+        """
+        Yield the end position, one past the last base, and the last bits
+        of the patterns matching there with each number of mismatches, the
+        fewest first.
+        """
+        masks, first, last = self.masks, self.first, self.last
+        if not self.mismatches:
+            state = 0
+            for position, char in enumerate(bases):
+                state = ((state << 1) | first) & masks[char]
+                if state & last:
+                    yield position + 1, 0, state & last
+            return
+        states = [0] * (self.mismatches + 1)
+        levels = range(1, self.mismatches + 1)
+        for position, char in enumerate(bases):
+            mask = masks[char]
+            shifted = (states[0] << 1) | first
+            states[0] = shifted & mask
+            for level in levels:
+                advanced = (states[level] << 1) | first
+                states[level] = (advanced & mask) | shifted
+                shifted = advanced
+            if states[-1] & last:
+                found = 0
+                for level, state in enumerate(states):
+                    ending = state & last & ~found
+                    if ending:
+                        found |= ending
+                        yield position + 1, level, ending
+
+    def find(self, bases, is_circular=False):
+        """
+        Yield a Hit for every match of a pattern on either strand, in order
+        of its end. Coordinates are pythonic and on the forward strand, a
+        start after the end spanning the origin. Hit.pattern is the index of
+        the pattern and Hit.mismatches the fewest it matches with.
+        """
+        length = len(bases)
+        bases = sequtils.extend_circular(bases, is_circular, self.max_length)
+        for end, mismatches, ending in self.scan(bases):
+            while ending:
+                bit = ending & -ending
+                ending ^= bit
+                pattern_length, strand, index = self.ends[bit]
+                span = sequtils.origin_span(end - pattern_length, end, length)
+                if span is not None:
+                    yield Hit(span[0], span[1], strand, index, mismatches)
+
+
+def search(pattern, bases, mismatches=0, is_circular=False):
+    """The matches of one degenerate pattern on either strand of bases"""
+    return list(Matcher([pattern], mismatches).find(bases, is_circular))
@@ -10,6 +10,8 @@ import hashlib
 import re
 import string
 
+import numpy as np
+
 TRANSLATE = {
     'TTT': 'F', 'TTC': 'F', 'TTA': 'L', 'TTG': 'L', 'TCT': 'S',
     'TCC': 'S', 'TCA': 'S', 'TCG': 'S', 'TAT': 'Y', 'TAC': 'Y',
@@ -97,16 +99,30 @@ MOD_CHAR = set("*")
 #Anything that is not
 NOT_DNA = re.compile(r"[^ACGTacgtMmRrWwSsYyKkVvHhDdBbXxNn]")
 
+# Complement tables for the full IUPAC alphabet in both cases, built once
+IUPAC_COMPLEMENTS = dict(DNA_COMPLEMENTS)
+IUPAC_COMPLEMENTS.update((key.lower(), value.lower()) for key, value in
+                         DNA_COMPLEMENTS.iteritems())
+COMPLEMENT_TABLE = string.maketrans(
+    str("".join(IUPAC_COMPLEMENTS)), str("".join(IUPAC_COMPLEMENTS.values())))
 UNICODE_TABLE = dict((ord(key), value) for key, value in
-                DNA_COMPLEMENTS.iteritems())
+                IUPAC_COMPLEMENTS.iteritems())
+
+# Tables for normalizing bases with str.translate: upper case every letter
+# and delete layout characters in one pass, then delete the legal bases to
+# find out whether anything else is left.
+UPPER_CASE = string.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+UNICODE_UPPER_CASE = dict((ord(lower), ord(upper)) for lower, upper in
+                          zip(string.ascii_lowercase, string.ascii_uppercase))
+IUPAC_BASES = str("".join(sorted(AMBIG_CHAR)))
+WHITESPACE = str(string.whitespace)
 
 
 def get_complement(seq_str):
     """get the complement of this sequence G --> C"""
     #Sequence will always be DNA in this context
     if isinstance(seq_str, str):
-        trans_table = string.maketrans(b'ACGTacgt', b'TGCAtgca')
-        return seq_str.translate(trans_table)
+        return seq_str.translate(COMPLEMENT_TABLE)
     else:
         return seq_str.translate(UNICODE_TABLE)
 
@@ -125,10 +141,358 @@ def get_reverse_complement(seq_str):
     return compliment[::-1]
 
 
+def normalize_bases(seq_str, delete=WHITESPACE):
+    """
+    Upper case a sequence and drop the delete characters in a single pass.
+    Return the cleaned bases, of the same type as seq_str, and the offsets in
+    them of every character outside the IUPAC DNA alphabet.
+    """
+    if isinstance(seq_str, unicode):
+        try:
+            seq_str = seq_str.encode('ascii')
+        except UnicodeEncodeError:
+            table = dict(UNICODE_UPPER_CASE)
+            table.update((ord(char), None) for char in delete)
+            bases = seq_str.translate(table)
+            return bases, [hit.start() for hit in NOT_DNA.finditer(bases)]
+        bases, illegal = normalize_bases(seq_str, delete)
+        return bases.decode('ascii'), illegal
+    bases = seq_str.translate(UPPER_CASE, str(delete))
+    if not bases.translate(None, IUPAC_BASES):
+        return bases, []
+    return bases, [hit.start() for hit in NOT_DNA.finditer(bases)]
+
+
+def reverse_complement_many(sequences):
+    """
+    Reverse complement a list of sequences, e.g. all the minus strand
+    feature patterns of a record, in one call.
+    """
+    return [seq_str.translate(COMPLEMENT_TABLE)[::-1]
+            if isinstance(seq_str, str) else
+            seq_str.translate(UNICODE_TABLE)[::-1] for seq_str in sequences]
+
+
+def as_bases(seq_str):
+    """
+    The bases of a sequence, a str, unicode or a PackedSequence, as a str.
+    Non ascii characters become '?'.
+    """
+    if isinstance(seq_str, unicode):
+        return seq_str.encode('ascii', 'replace')
+    if not isinstance(seq_str, str):
+        return str(seq_str)
+    return seq_str
+
+
+def record_bases(record):
+    """
+    The bases of a parsed molecule record, held as sequence bases by the
+    GenBank and SnapGene parsers and as sequence seq by the fasta parser.
+    None if the record has no sequence.
+    """
+    sequence = record.get('sequence')
+    if not isinstance(sequence, dict):
+        return None
+    return sequence.get('bases', sequence.get('seq'))
+
+
+def extend_circular(bases, is_circular, max_length):
+    """
+    The bases as a str, followed when circular by those from past the
+    origin that a match of up to max_length bases spanning it needs
+    """
+    bases = as_bases(bases)
+    length = len(bases)
+    if is_circular and length:
+        bases += bases[:min(max_length - 1, length)]
+    return bases
+
+
+def origin_span(start, end, length):
+    """
+    Place a match at [start, end) of bases from extend_circular back on the
+    molecule, with an end past the origin wrapped round. None for a match
+    found again past the origin, or longer than the molecule.
+    """
+    if start >= length or end - start > length:
+        return None
+    return start, end if end <= length else end - length
+
+
+class SequenceContext(object):
+    """
+    The bases of one molecule, serving the patterns of its features on
+    either strand. The reverse complement of the whole molecule is computed
+    once, on the first minus strand request, so each pattern is then a slice.
+    """
+    __slots__ = ('bases', 'is_circular', '_reverse')
+
+    def __init__(self, bases, is_circular=False):
+        self.bases = bases
+        self.is_circular = is_circular
+        self._reverse = None
+
+    def __len__(self):
+        return len(self.bases)
+
+    @property
+    def reverse(self):
+        """The reverse complement of the whole molecule"""
+        if self._reverse is None:
+            try:
+                self._reverse = self.bases.reverse_complement()
+            except AttributeError:
+                self._reverse = get_reverse_complement(self.bases)
+        return self._reverse
+
+    def reverse_slice(self, start, end):
+        """The reverse complement of bases[start:end], as a slice"""
+        length = len(self.bases)
+        start, end, _ = slice(start, end).indices(length)
+        if start >= end:
+            return self.bases[:0]
+        return self.reverse[length - end:length - start]
+
+    def extract(self, start, end, strand=1):
+        """
+        The bases of [start, end) on the given strand, read 5' to 3'. On a
+        circular molecule a start after the end spans the origin. Returns an
+        empty sequence when there are no such bases.
+        """
+        if start < end:
+            if strand < 0:
+                return self.reverse_slice(start, end)
+            return self.bases[start:end]
+        if not self.is_circular:
+            return self.bases[:0]
+        # Feature spans replication origin
+        if strand < 0:
+            return self.reverse_slice(0, end) + \
+                self.reverse_slice(start, len(self.bases))
+        return self.bases[start:] + self.bases[:end]
+
+
+# Codons as integers: each base is a two bit code, A, C, G and T as in
+# DNA_BYTES, and a codon is 16 * first + 4 * second + third. Anything other
+# than ACGT, in either case, is coded INVALID_BASE, and a codon holding one
+# is coded INVALID_CODON, which translates to X.
+INVALID_BASE = 4
+INVALID_CODON = 64
+BASE_CODES = np.full(256, INVALID_BASE, dtype=np.uint8)
+for _base, _code in DNA_BYTES.iteritems():
+    BASE_CODES[ord(_base)] = BASE_CODES[ord(_base.lower())] = int(_code)
+
+
+def encode_codon(codon):
+    """The integer code of an unambiguous codon"""
+    return sum(int(DNA_BYTES[base]) << shift
+               for base, shift in zip(codon.upper(), (4, 2, 0)))
+
+
+CODON_AMINO_ACIDS = np.full(INVALID_CODON + 1, ord('X'), dtype=np.uint8)
+for _codon, _amino_acid in TRANSLATE.iteritems():
+    CODON_AMINO_ACIDS[encode_codon(_codon)] = ord(_amino_acid)
+STOP_CODONS = CODON_AMINO_ACIDS == ord('*')
+START_CODONS = ('ATG',)
+MIN_ORF_LENGTH = 75  # bases, including the stop codon
+
+
+def encode_bases(seq_str):
+    """The base codes of a sequence as a uint8 array"""
+    return BASE_CODES[np.frombuffer(as_bases(seq_str), dtype=np.uint8)]
+
+
+def reverse_complement_codes(codes):
+    """The base codes of the reverse complement strand"""
+    return np.where(codes < INVALID_BASE, 3 - codes, codes)[::-1]
+
+
+def encode_codons(codes):
+    """
+    The code of the codon starting at every position of the base codes, so
+    frame f of the strand is encode_codons(codes)[f::3].
+    """
+    if len(codes) < 3:
+        return np.zeros(0, dtype=np.uint8)
+    first, second, third = codes[:-2], codes[1:-1], codes[2:]
+    codons = (first << 4) | ((second & 3) << 2) | (third & 3)
+    invalid = (first | second | third) & INVALID_BASE
+    codons[invalid != 0] = INVALID_CODON
+    return codons
+
+
+def translate(seq_str, frame=0):
+    """
+    Translate the forward strand of a sequence from frame 0, 1 or 2,
+    dropping a trailing partial codon. Ambiguous codons translate to X.
+    """
+    codons = encode_codons(encode_bases(seq_str))[frame::3]
+    return CODON_AMINO_ACIDS[codons].tostring()
+
+
+def six_frame_translation(seq_str):
+    """
+    Translate all three frames of both strands. Returns a dict keyed by
+    (strand, frame), the frames of the minus strand counting from its own
+    5' end, i.e. the end of the sequence.
+    """
+    codes = encode_bases(seq_str)
+    translations = {}
+    for strand, strand_codes in ((1, codes),
+                                 (-1, reverse_complement_codes(codes))):
+        amino_acids = CODON_AMINO_ACIDS[encode_codons(strand_codes)]
+        for frame in range(3):
+            translations[strand, frame] = amino_acids[frame::3].tostring()
+    return translations
+
+
+def frame_orfs(codons, is_start, min_codons, max_codons=None):
+    """
+    The ORFs of one frame of codon codes, as arrays of the index of their
+    first codon and of their stop codon. Each runs from the first start
+    codon after a stop codon, or the beginning, to the next stop codon.
+    Starts further than max_codons from their stop are passed over.
+    """
+    stops = np.flatnonzero(STOP_CODONS[codons])
+    starts = np.flatnonzero(is_start[codons])
+    ends = np.searchsorted(stops, starts)
+    closed = ends < len(stops)  # only ORFs which are closed
+    starts, ends = starts[closed], ends[closed]
+    if max_codons is not None:
+        fits = stops[ends] - starts + 1 <= max_codons
+        starts, ends = starts[fits], ends[fits]
+    # the first start before each stop
+    ends, first = np.unique(ends, return_index=True)
+    starts, ends = starts[first], stops[ends]
+    long_enough = ends - starts + 1 >= min_codons
+    return starts[long_enough], ends[long_enough]
+
+
+def find_orfs(seq_str, is_circular=False, min_length=MIN_ORF_LENGTH,
+              start_codons=START_CODONS):
+    """
+    Find the open reading frames on both strands of a sequence, each from a
+    start codon to the first stop codon in frame, which it includes. ORFs
+    inside a longer one in the same frame are not reported. Returns dicts
+    with pythonic start and end coordinates on the forward strand, the
+    strand and the frame, counted from the 5' end of the strand. On a
+    circular sequence an ORF may span the origin, its start then coming
+    after its end, but is never longer than the sequence.
+    """
+    codes = encode_bases(seq_str)
+    length = len(codes)
+    is_start = np.zeros(INVALID_CODON + 1, dtype=bool)
+    is_start[[encode_codon(codon) for codon in start_codons]] = True
+    min_codons = -(-min_length // 3)
+    orfs = []
+    for strand, strand_codes in ((1, codes),
+                                 (-1, reverse_complement_codes(codes))):
+        offset, max_codons = 0, None
+        if is_circular and length:
+            # three turns, to find the ORFs starting in the middle one with
+            # as much of the molecule as they can span on either side. A
+            # start more than one turn upstream does not hide the ORF.
+            strand_codes = np.tile(strand_codes, 3)
+            offset, max_codons = length, length // 3
+        codons = encode_codons(strand_codes)
+        for frame in range(3):
+            starts, ends = frame_orfs(codons[frame::3], is_start, min_codons,
+                                      max_codons)
+            starts = starts * 3 + frame
+            ends = ends * 3 + frame + 3
+            if offset:
+                keep = (starts >= offset) & (starts < offset + length)
+                starts, ends = starts[keep] - offset, ends[keep] - offset
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                orf_frame = start % 3
+                if strand < 0:
+                    start, end = length - end, length - start
+                if offset:
+                    start, end = start % length, end % length or length
+                orfs.append({
+                    'start': start,
+                    'end': end,
+                    'strand': strand,
+                    'frame': orf_frame,
+                })
+    return orfs
+
+
+ROTATION_CANDIDATES = 8  # compared as strings by least_rotation
+
+
+def least_rotation(seq_str):
+    """
+    The offset of the lexicographically least rotation of a sequence. Every
+    rotation starts as a candidate and is compared a character, or a block
+    of them packed into one integer, at a time, keeping the least.
+    Of two candidates closer together than the characters they match, the
+    later cannot be less, so candidates thin out even in repeats. The last
+    few are compared as strings.
+    """
+    if isinstance(seq_str, unicode):
+        seq_str = seq_str.encode('utf-8')
+    seq_str = bytes(seq_str)
+    chars = np.frombuffer(seq_str, dtype=np.uint8)
+    length = len(chars)
+    if length < 2:
+        return 0
+    present = np.bincount(chars, minlength=256) > 0
+    ranks = (np.cumsum(present) - 1)[chars]  # keeping the order of chars
+    bits = max(int(present.sum() - 1).bit_length(), 1)
+    least = np.arange(length)
+    matched = 0
+    while len(least) > ROTATION_CANDIDATES and matched < length:
+        # one character at a time while there are many candidates
+        width = 1 if len(least) * 8 > length else 62 // bits
+        block = np.zeros(len(least), dtype=np.int64)
+        for offset in range(matched, matched + width):
+            block = (block << bits) | ranks[(least + offset) % length]
+        least = least[block == block.min()]
+        matched += width
+        spaced = np.ones(len(least), dtype=bool)
+        spaced[1:] = np.diff(least) > matched
+        least = least[spaced]
+    if matched >= length:
+        return int(least[0])  # the others are the same rotation
+    doubled = seq_str + seq_str
+    return int(min(least, key=lambda start: doubled[start:start + length]))
+
+
+def canonical_rotation(seq_str):
+    """
+    The least rotation of either strand of a circular sequence, which is the
+    same wherever the origin is numbered and whichever strand is given.
+    """
+    bases, _ = normalize_bases(as_bases(seq_str))
+    reverse = get_reverse_complement(bases)
+    forward_start, reverse_start = least_rotation(bases), least_rotation(reverse)
+    return min(bases[forward_start:] + bases[:forward_start],
+               reverse[reverse_start:] + reverse[:reverse_start])
+
+
+def canonical_sha1(seq_str):
+    """The sha1 hash of the canonical rotation of a circular sequence"""
+    return hashlib.sha1(canonical_rotation(seq_str)).hexdigest()
+
+
+def add_canonical_sha1(record):
+    """
+    Add the canonical_sha1 of a parsed circular molecule record to its
+    sequence. It is not computed by default, being far slower than sha1 on
+    chromosome sized records, so parsers only add it when asked.
+    """
+    bases = record_bases(record)
+    if record.get('is_circular') and bases:
+        record['sequence']['canonical_sha1'] = canonical_sha1(bases)
+    return record
+
+
 def compute_sha1(data):
     """Compute the sha1 hash of a sequence"""
     try:
-        bases = data.get('bases').replace('\n', '').upper()
+        bases, _ = normalize_bases(data.get('bases'), delete='\n')
         data['sha1'] = hashlib.sha1(bases).hexdigest()
         data['bases'] = bases
     except AttributeError:
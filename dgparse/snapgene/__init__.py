@@ -3,16 +3,20 @@
 Parse Snap Gene File Format and adapt to DTG Schema.
 """
 import hashlib
-import functools
 import uuid
 
 from dgparse import sequtils
+from dgparse.exc import ParserException
 
 from .main import main, parse_snapgene
 
 # Explicitly define our mapping
 STRAND = [0, 1, -1, 0]
 
+# The segments extract_molecule uses, primers are not needed
+MOLECULE_SEGMENTS = ('DNA', 'descriptor', 'features', 'notes',
+                     'other_properties')
+
 
 def extract_sequence(snap_data):
     """
@@ -66,28 +70,34 @@ def extract_coordinates(annotation_data):
 
 def extract_annotation(sequence, is_circular, annotation_data):
     """
-    Extract the list of annotated features in this sequence
+    Extract a single annotated feature of this sequence
+    :return:
+    """
+    return extract_annotations(sequence, is_circular, [annotation_data])[0]
+
+
+def extract_annotations(sequence, is_circular, feature_array):
+    """
+    Extract the list of annotated features in this sequence. Minus strand
+    patterns are sliced from a reverse complement computed once per molecule
     :return:
     """
     # TODO this object will also need properties to store formatting info
-    start, end, strand = extract_coordinates(annotation_data)
-    if start < end:
-        bases = sequence['bases'][start:end]
-    elif is_circular:
-        # Feature spans replication origin
-        bases = sequence['bases'][start:] + sequence['bases'][:end]
-    if not bases:
-        raise ParserException('No bases could be parsed for a feature')
-    if strand < 0:
-        bases = sequtils.get_reverse_complement(bases)
-    dnafeature = extract_feature(annotation_data, bases)
-    return {
-        'type_': 'dnamolecule_dnafeature',
-        'start': start,
-        'end': end,
-        'strand': strand,
-        'dnafeature': dnafeature,
-    }
+    context = sequtils.SequenceContext(sequence['bases'], is_circular)
+    annotations = []
+    for annotation_data in feature_array:
+        start, end, strand = extract_coordinates(annotation_data)
+        bases = context.extract(start, end, strand)
+        if not bases:
+            raise ParserException('No bases could be parsed for a feature')
+        annotations.append({
+            'type_': 'dnamolecule_dnafeature',
+            'start': start,
+            'end': end,
+            'strand': strand,
+            'dnafeature': extract_feature(annotation_data, bases),
+        })
+    return annotations
 
 
 def drop_source(annotation_dict):
@@ -105,9 +115,9 @@ def extract_molecule(molecule):
     """
     is_circular = (molecule['DNA'].pop('topology') == 'circular')
     sequence = extract_sequence(molecule)
-    extractor = functools.partial(extract_annotation, sequence, is_circular)
     feature_array = molecule.pop('features', [])
-    annotations = map(extractor, feature_array) if feature_array else []
+    annotations = extract_annotations(sequence, is_circular,
+                                      feature_array) if feature_array else []
     annotations = filter(drop_source, annotations) 
     description = molecule.pop('descriptor').get('name', None)
     properties = molecule.pop('notes')
@@ -126,12 +136,16 @@ def extract_molecule(molecule):
     }
 
 
-def parse(open_file):
+def parse(open_file, canonical=False):
     """
-    Parse an open snapgene file and convert it into standard DeskGen format
+    Parse an open snapgene file and convert it into standard DeskGen format.
+    With canonical=True a circular sequence gets a canonical_sha1.
     :param open_file:
     :return:
     """
-    snap_result = parse_snapgene(open_file)
-    return extract_molecule(snap_result)
+    snap_result = parse_snapgene(open_file, MOLECULE_SEGMENTS)
+    molecule = extract_molecule(snap_result)
+    if canonical:
+        sequtils.add_canonical_sha1(molecule)
+    return molecule
 
@@ -36,8 +36,14 @@ from __future__ import division
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
-import struct
+import collections
+import glob
 import json
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
 
 from ..exc import ParserException, FormatException
 
@@ -75,6 +81,14 @@ SEGMENT_PARSERS = {
     18: noop,  # Sequence Trace Segment
 }
 
+SEGMENT_HEADER = struct.Struct(b'>BI')
+
+BAD_SEGMENT = ('Badly formed segment or missing segment. '
+               'Current segment: {0} Previous Segment: {1}')
+
+# Where a segment's contents lie in the file
+SegmentEntry = collections.namedtuple('SegmentEntry', ['type', 'offset', 'length'])
+
 SEGMENT_NAME = {
     0: 'DNA',  # Information about the DNA sequence itself
     5: 'primers',  # associated primers
@@ -85,17 +99,17 @@ SEGMENT_NAME = {
 }
 
 
-def parse_snapgene(f):
+def parse_snapgene(f, segments=None):
     """
     snapgene class holds parsed Snapgene data.
 
     Arguments:
     f: a snapgene .dna file, opened for reading
+    segments: names of the segments to decode, e.g. ('DNA', 'descriptor'),
+    by default all of them. Other segments are skipped without being read.
 
     Attributes:
     data (dict): information parsed from the snapgene file.
-    unknown (dict): unknown segments from the snapgene file (not parsed).
-    Key: segment number; Value: Unparsed segment data.
 
     More information about the data attribute:
     data has six keys (str): DNA, descriptor, features, primers,
@@ -143,58 +157,155 @@ def parse_snapgene(f):
     "Segment": sement information (dict). Keys: "color", "range", "type"
 
     """
-    container = {
-        "DNA": None,
-        "descriptor": None,
-        "features": None,
-        "primers": None,
-        "other_properties": None,
-        "notes": None
-    }
-    unknown = {}
-
-    segment = f.read(5)
-    seg = None
-    lastSeg = None
-    while segment:
-        if seg is not None:
-            lastSeg = seg
-        seg, seg_len = struct.unpack(b'>BI', segment)
+    wanted = set(SEGMENT_NAME.values() if segments is None else segments)
+    not_segments = wanted.difference(SEGMENT_NAME.values())
+    if not_segments:
+        raise ValueError("Unknown SnapGene segments {0}".format(
+            ', '.join(sorted(not_segments))))
+    container = dict.fromkeys(SEGMENT_NAME.values())
+
+    data, start = map_file(f)
+    try:
+        index = index_segments(data, start)
+        for number, (seg, offset, length) in enumerate(index):
+            if SEGMENT_NAME.get(seg) not in wanted:
+                continue
+            try:
+                parsed_data = decode(seg, data[offset:offset + length],
+                                     SEGMENT_PARSERS)
+            except UnicodeEncodeError:
+                # intercept these
+                raise
+            except Exception:
+                last_seg = index[number - 1].type if number else None
+                raise FormatException(BAD_SEGMENT.format(seg, last_seg))
+            container[SEGMENT_NAME[seg]] = parsed_data
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+    if 'descriptor' in wanted and container["descriptor"] is None:
+        raise Exception("No snapgene Descriptor. Is this a snapgene .dna file?")
+
+    if 'DNA' in wanted and container["DNA"] is None:
+        raise Exception("No DNA Sequence Provided!")
+    return container
+
+
+def map_file(f):
+    """
+    Map an open file on disk into memory, so segments can be sliced out of
+    it without reading the rest. Return the data and the offset in it of
+    the file's current position. Anything else, e.g. a GzipFile, whose
+    fileno() is that of the compressed file, is read from where it is.
+    """
+    if isinstance(f, file):
+        start = f.tell()
         try:
-            data = f.read(seg_len)
-            parsed_data = decode(seg, data, SEGMENT_PARSERS)
-        except UnicodeEncodeError:
-            # intercept these
-            raise
-        except Exception as exc:
-            # this is not totally robust: the error is raised because of a
-            # key error following the wrong number of bytes in the previous
-            # segment. It is possible that this still gives a valid key,
-            # despite earlier error.
-            fmt_str = ('Badly formed segment or missing segment. '
-                       'Current segment: {0} Previous Segment: {1}')
-            raise FormatException(fmt_str.format(seg, lastSeg))
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):
+            pass  # empty, or not a regular file
+        else:
+            f.seek(0, os.SEEK_END)  # consumed, as by read()
+            return data, start
+    return f.read(), 0
+
 
+def index_segments(data, offset=0):
+    """
+    List the (type, offset, length) of every segment in the bytes of a
+    snapgene file starting at offset, checking the segment headers chain up
+    to the end. Segment contents are not copied.
+    """
+    index = []
+    seen = set()
+    last_seg = None
+    while offset < len(data):
+        if offset + SEGMENT_HEADER.size > len(data):
+            raise FormatException(BAD_SEGMENT.format(None, last_seg))
+        seg, seg_len = SEGMENT_HEADER.unpack_from(data, offset)
+        offset += SEGMENT_HEADER.size
+        # A wrong segment length in the previous header lands us in the
+        # middle of a segment, which rarely gives a known segment type.
+        if seg not in SEGMENT_PARSERS or offset + seg_len > len(data):
+            raise FormatException(BAD_SEGMENT.format(seg, last_seg))
         if seg in SEGMENT_NAME:
-            if container[SEGMENT_NAME[seg]] is not None:
-                errMsg = "Duplicate segments. Current segment: %s Previous segment: %s" % (seg, lastSeg)
+            if seg in seen:
+                errMsg = "Duplicate segments. Current segment: %s Previous segment: %s" % (seg, last_seg)
                 raise FormatException(errMsg)
-            else:
-                container[SEGMENT_NAME[seg]] = parsed_data
-        else:
-            # if we don't know how to parse it keep in "unknown" dictionary
-            unknown[seg] = parsed_data
-        segment = f.read(5)
+            seen.add(seg)
+        index.append(SegmentEntry(seg, offset, seg_len))
+        offset += seg_len
+        last_seg = seg
+    return index
 
-    if container["descriptor"] is None:
-        raise Exception("No snapgene Descriptor. Is this a snapgene .dna file?")
 
-    if container["DNA"] is None:
-        raise Exception("No DNA Sequence Provided!")
-    return container
+def find_inputs(paths):
+    """
+    Expand files, directories (searched recursively for .dna files) and glob
+    patterns into a sorted list of unique file paths.
+    """
+    found = set()
+    for path in paths:
+        for match in glob.glob(path) or [path]:
+            if os.path.isdir(match):
+                for root, _, names in os.walk(match):
+                    found.update(os.path.join(root, name) for name in names
+                                 if name.lower().endswith('.dna'))
+            else:
+                found.add(match)
+    return sorted(found)
 
 
-def main():
+def output_names(paths):
+    """
+    Map each input path to a .json path mirroring where it sits below the
+    deepest directory holding all the inputs, so equal file names in
+    different directories do not collide.
+    """
+    folders = [os.path.dirname(os.path.abspath(path)).split(os.sep)
+               for path in paths]
+    common = []
+    for parts in zip(*folders):
+        if len(set(parts)) > 1:
+            break
+        common.append(parts[0])
+    base = os.sep.join(common) or os.sep
+    return {path: os.path.splitext(
+        os.path.relpath(os.path.abspath(path), base))[0] + '.json'
+            for path in paths}
+
+
+def convert_file(path):
+    """
+    Parse one .dna file to JSON text. Returns (path, json, error message),
+    never raising, so one bad file does not stop a batch.
+    """
+    try:
+        with open(path, 'rb') as f:
+            result = parse_snapgene(f)
+        return path, json.dumps(result, sort_keys=True), None
+    except Exception as exc:
+        return path, None, '{0}: {1}'.format(type(exc).__name__, exc)
+
+
+def convert_files(paths, workers=1):
+    """Yield convert_file results as they complete, using a process pool"""
+    if workers < 2 or len(paths) < 2:
+        for path in paths:
+            yield convert_file(path)
+        return
+    pool = multiprocessing.Pool(min(workers, len(paths)))
+    try:
+        for result in pool.imap_unordered(convert_file, paths, chunksize=8):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def main(argv=None):
     # TODO
     # XML parsing sections parse only those sections included in the file
     # parser(and represented in the example file), so if there are other xml
@@ -207,18 +318,53 @@ def main():
     # Error handling is not great:
     # custom exceptions could hide stacktrace from debugging.
 
-    # Test output to json -- is this correct json?
-
     import argparse
     parser = argparse.ArgumentParser(description='Parser for SnapGene .dna \
-        files. Usage: python snapgene.py /path/to/my/snapgene.dna')
-    parser.add_argument('SnapGeneFile', metavar='SnapGeneFile',
-                        type=str, help='filepath to SnapGene .dna file.')
-
-    args = parser.parse_args()
-
-    with open(args.SnapGeneFile, "r") as f:
-        mySnapgene = parse_snapgene(f)
-
-    print json.dumps(mySnapgene, sort_keys=True, indent=4,
-                     separators=(',', ': '))
+        files. Usage: snapgene-json /path/to/my/snapgene.dna, or give several \
+        files, directories or glob patterns to convert them all to \
+        newline-delimited JSON.')
+    parser.add_argument('SnapGeneFile', metavar='SnapGeneFile', nargs='+',
+                        type=str, help='.dna files, directories or globs.')
+    parser.add_argument('--workers', type=int,
+                        default=multiprocessing.cpu_count(),
+                        help='number of processes to parse files with.')
+    parser.add_argument('--output', type=argparse.FileType('w'),
+                        default=sys.stdout,
+                        help='file to write newline-delimited JSON to.')
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help='write one <name>.json per input into DIR, '
+                        'keeping the relative layout of the inputs.')
+    args = parser.parse_args(argv)
+
+    paths = find_inputs(args.SnapGeneFile)
+    if len(paths) == 1 and os.path.isfile(paths[0]) and not args.output_dir:
+        with open(paths[0], "rb") as f:
+            mySnapgene = parse_snapgene(f)
+        args.output.write(json.dumps(mySnapgene, sort_keys=True, indent=4,
+                                     separators=(',', ': ')) + '\n')
+        return 0
+
+    names = output_names(paths)
+    written = set()
+    failures = 0
+    for path, result, error in convert_files(paths, args.workers):
+        if error is None and args.output_dir:
+            name = os.path.join(args.output_dir, names[path])
+            if name in written:
+                error = 'Output {0} already written for another input'.format(
+                    name)
+        if error is not None:
+            failures += 1
+            sys.stderr.write('{0}: {1}\n'.format(path, error))
+        elif args.output_dir:
+            written.add(name)
+            if not os.path.isdir(os.path.dirname(name)):
+                os.makedirs(os.path.dirname(name))
+            with open(name, 'w') as out:
+                out.write(result + '\n')
+        else:
+            args.output.write('{{"file": {0}, "snapgene": {1}}}\n'.format(
+                json.dumps(path), result))
+    sys.stderr.write('Converted {0} of {1} files\n'.format(
+        len(paths) - failures, len(paths)))
+    return 1 if failures else 0
@@ -5,8 +5,10 @@ from __future__ import division
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import io
 import struct
 
+import xml.etree.cElementTree as cElementTree
 import xml.etree.ElementTree as ET
 
 noop = lambda x: x
@@ -181,44 +183,67 @@ def parse_primers(data):
     return primer_dict
 
 
-def parse_features(data):
-    all_features = []
-    top_level = {"name": unicode,  # Need to use unicode here for name
-                 "swappedSegmentNumbering": bool,
-                 "allowSegmentOverlaps": bool,
-                 "directionality": int,
-                 "consecutiveTranslationNumbering": bool,
-                 "readingFrame": int,
-                 "type": str,
-                 "recentID": int,
-                 "translationMW": float,
-                 "hitsStopCodon": bool
-                 }
-
-    second_level = {"color": str, "range": str, "type": str}
-
-    features = ET.fromstring(data)
-    for feature in features:
-        feature_dict = {}
-        for item, func in top_level.iteritems():
-            if item in feature.attrib:
-                feature_dict[item] = func(feature.attrib[item])
-
-        feature_dict["Notes"] = {}
-        for feat in feature:
-            segment_dict = {}
-            if feat.tag == "Segment":
-                for item, func in second_level.iteritems():
-                    if item in feat.attrib:
-                        segment_dict[item] = func(feat.attrib[item])
-                feature_dict["Segment"] = segment_dict
+# Converters for the attributes of a Feature and of its Segments
+FEATURE_ATTRIBUTES = {
+    "name": unicode,  # Need to use unicode here for name
+    "swappedSegmentNumbering": bool,
+    "allowSegmentOverlaps": bool,
+    "directionality": int,
+    "consecutiveTranslationNumbering": bool,
+    "readingFrame": int,
+    "type": str,
+    "recentID": int,
+    "translationMW": float,
+    "hitsStopCodon": bool
+}
+
+SEGMENT_ATTRIBUTES = {"color": str, "range": str, "type": str}
+
+
+def convert_attributes(attrib, converters):
+    """Convert the attributes present which have a converter"""
+    converted = {}
+    for item, value in attrib.iteritems():
+        func = converters.get(item)
+        if func is not None:
+            converted[item] = func(value)
+    return converted
+
+
+def decode_feature(feature):
+    """Decode a complete Feature element"""
+    feature_dict = convert_attributes(feature.attrib, FEATURE_ATTRIBUTES)
+    feature_dict["Notes"] = {}
+    for feat in feature:
+        if feat.tag == "Segment":
+            feature_dict["Segment"] = convert_attributes(feat.attrib,
+                                                         SEGMENT_ATTRIBUTES)
+        elif (feat.tag == "Q") or (feat.tag == "Qualifier"):
+            for f in feat:
+                for k, v in f.attrib.iteritems():
+                    feature_dict["Notes"][feat.attrib["name"]] = v
+    return feature_dict
 
-            elif (feat.tag == "Q") or (feat.tag == "Qualifier"):
-                for f in feat:
-                    for k, v in f.attrib.iteritems():
-                        feature_dict["Notes"][feat.attrib["name"]] = v
-        all_features.append(feature_dict)
 
+def parse_features(data):
+    """
+    Decode the Features XML incrementally: each Feature is converted as
+    soon as its end tag is read and then dropped from the tree.
+    """
+    all_features = []
+    depth = 0
+    root = None
+    for event, element in cElementTree.iterparse(io.BytesIO(data),
+                                                 events=(b'start', b'end')):
+        if event == 'start':
+            depth += 1
+            if root is None:
+                root = element
+            continue
+        depth -= 1
+        if depth == 1:
+            all_features.append(decode_feature(element))
+            root.clear()
     return all_features
 
 
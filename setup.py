@@ -11,6 +11,7 @@ setup(
         'openpyxl>=2.4.0',
         'xlsxwriter',
         'marshmallow>=2.0.0b4',
+        'numpy',
     ],
     entry_points={
         'console_scripts': ['snapgene-json = dgparse.snapgene.main:main'],
@@ -23,3 +23,14 @@ def test_parse_fasta(path, expected_name, expected_length):
         ret_dict = ret if isinstance(ret, dict) else ret[0] # first sequence in file
         assert ret_dict['name'] == expected_name
         assert len(ret_dict['sequence']['bases']) == expected_length
+
+
+def test_file_contents_kept_for_small_files():
+    """A single record file is kept alongside it, unless it is large"""
+    from dgparse.fasta import parse_fasta
+    text = b'>small\nACGTACGT\n'
+    assert fasta.parse(io.BytesIO(text))['file_contents'] == text
+    record, = parse_fasta.parse_fasta_file(io.BytesIO(text))
+    assert record['file_contents'] == text
+    large = b'>large\n' + b'ACGT' * (parse_fasta.MAX_FILE_CONTENTS // 4)
+    assert 'file_contents' not in fasta.parse(io.BytesIO(large))
@@ -0,0 +1,95 @@
+'''Test the fasta index and region fetch'''
+import io
+import os
+
+import pytest
+
+from dgparse import sequtils
+from dgparse.exc import FormatException
+from dgparse.fasta.index import IndexedFasta, build_index, read_index, write_index
+from dgparse.fasta.parse_fasta import parse_fasta_file
+
+DATA = os.path.join(os.path.dirname(__file__), '../../data/fasta')
+
+MULTI = '>one first\nACGTA\nCCGGT\nAT\n>two\nggggc\nTTA\n'
+
+
+@pytest.fixture
+def multi(tmpdir):
+    path = str(tmpdir.join('multi.fa'))
+    with open(path, 'wb') as out:
+        out.write(MULTI)
+    return path
+
+
+def test_build_index_matches_samtools_layout():
+    """Entries record length, sequence offset and line layout"""
+    entries = build_index(io.BytesIO(MULTI))
+    assert [tuple(entry) for entry in entries] == [
+        ('one', 12, 11, 5, 6),
+        ('two', 8, 31, 5, 6),
+    ]
+    fai = io.BytesIO()
+    write_index(entries, fai)
+    assert fai.getvalue() == 'one\t12\t11\t5\t6\ntwo\t8\t31\t5\t6\n'
+    fai.seek(0)
+    assert list(read_index(fai).values()) == entries
+
+
+@pytest.mark.parametrize('payload', (
+    '>bad\nACGT\nAC\nACGT\n',
+    '>bad\nACG\nACGTA\n',
+    '>bad\rACGT\rACGT\r',
+))
+def test_build_index_rejects_irregular_files(payload):
+    with pytest.raises(FormatException):
+        build_index(io.BytesIO(payload))
+
+
+def test_fetch_regions(multi):
+    """Any region can be fetched, including across line breaks"""
+    with IndexedFasta(multi) as fasta:
+        assert 'one' in fasta and len(fasta) == 2
+        bases = 'ACGTACCGGTAT'
+        for start in range(len(bases)):
+            for end in range(start + 1, len(bases) + 1):
+                assert fasta.fetch('one', start, end) == bases[start:end]
+        assert fasta.fetch('two') == 'ggggcTTA'
+        assert fasta.fetch('two', 3, 7, strand=-1) == 'AAgc'
+        assert fasta.fetch('one', 10, 100) == 'AT'
+        assert fasta.fetch('one', 5, 5) == ''
+        with pytest.raises(KeyError):
+            fasta.fetch('three', 0, 1)
+    assert os.path.exists(multi + '.fai')
+    with IndexedFasta(multi) as fasta:  # reuses the saved index
+        assert fasta.fetch('one', 4, 6) == 'AC'
+
+
+def test_unwritable_index_is_kept_in_memory(multi, monkeypatch):
+    import errno
+    from dgparse.fasta import index
+
+    def read_only(path, mode='r'):
+        if 'w' in mode:
+            raise IOError(errno.EACCES, 'Permission denied', path)
+        return open(path, mode)
+    monkeypatch.setattr(index, 'open', read_only, raising=False)
+    with IndexedFasta(multi) as fasta:
+        assert fasta.fetch('two') == 'ggggcTTA'
+    assert not os.path.exists(multi + '.fai')
+
+
+def test_fetch_agrees_with_parser(tmpdir):
+    """Fetching a whole record gives the parsed sequence, CRLF or not"""
+    with open(os.path.join(DATA, 'pEGFP-N1.fasta'), 'rb') as fasta_file:
+        payload = fasta_file.read()  # classic Mac line endings
+    path = str(tmpdir.join('pEGFP-N1.fasta'))
+    with open(path, 'wb') as out:
+        out.write(payload.replace('\r', '\r\n'))
+    with open(path, 'rb') as fasta_file:
+        bases = parse_fasta_file(fasta_file)[0]['sequence']['seq']
+    with IndexedFasta(path, save_index=False) as fasta:
+        assert fasta.fetch('pEGFP-N1') == bases
+        assert fasta.fetch('pEGFP-N1', 100, 250, strand=-1) == \
+            sequtils.get_reverse_complement(bases[100:250])
+    assert not os.path.exists(path + '.fai')
@@ -0,0 +1,72 @@
+'''Test parsing a fasta file in shards across processes'''
+import io
+import random
+
+import pytest
+
+from dgparse.fasta import parallel
+from dgparse.fasta.parse_fasta import iter_fasta, parse_fasta_file
+
+
+@pytest.fixture
+def oligo_pool(tmpdir, monkeypatch):
+    """Many short records, with small shards so the file is split"""
+    monkeypatch.setattr(parallel, 'SHARD_SIZE', 512)
+    rand = random.Random(0)
+    lines = []
+    for number in range(500):
+        lines.append('>oligo{0} linear pool'.format(number))
+        lines.append(''.join(rand.choice('ACGT') for _ in range(60)))
+        lines.append(''.join(rand.choice('ACGT') for _ in range(number % 40)))
+    path = str(tmpdir.join('pool.fasta'))
+    with open(path, 'wb') as out:
+        out.write('\r\n'.join(lines) + '\r\n')
+    return path
+
+
+def test_shards_hold_whole_records(oligo_pool):
+    ranges = parallel.shard_ranges(oligo_pool, 8)
+    assert len(ranges) == 8
+    with open(oligo_pool, 'rb') as fasta_file:
+        payload = fasta_file.read()
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(payload)
+    for (start, end), (next_start, _) in zip(ranges, ranges[1:]):
+        assert end == next_start
+        assert payload[next_start] == '>' and payload[next_start - 1] == '\n'
+
+
+@pytest.mark.parametrize('ordered', (True, False))
+def test_parallel_records_match_serial(oligo_pool, ordered):
+    with open(oligo_pool, 'rb') as fasta_file:
+        expected = list(iter_fasta(fasta_file))
+    records = list(parallel.iter_fasta_parallel(oligo_pool, workers=2,
+                                                ordered=ordered))
+    if not ordered:
+        records.sort(key=lambda seqrec: int(seqrec['name'][5:]))
+    assert records == expected
+    with open(oligo_pool, 'rb') as fasta_file:
+        assert parse_fasta_file(fasta_file, workers=2) == expected
+
+
+def test_compressed_files_are_parsed_serially(oligo_pool):
+    import gzip
+    from dgparse import compression
+    with open(oligo_pool, 'rb') as fasta_file:
+        expected = list(iter_fasta(fasta_file))
+    path = oligo_pool + '.gz'
+    with open(oligo_pool, 'rb') as source:
+        with gzip.open(path, 'wb') as out:
+            out.write(source.read())
+    fasta_file = compression.open_file(path)
+    try:
+        assert parse_fasta_file(fasta_file, workers=2) == expected
+    finally:
+        fasta_file.close()
+
+
+def test_next_header_finds_split_boundary():
+    payload = io.BytesIO('>a\nACGT\n>b\nCC\n')
+    assert parallel.next_header(payload, 1) == 8
+    assert parallel.next_header(payload, 8) == 8
+    assert parallel.next_header(payload, 9) is None
+    assert parallel.next_header(payload, 1, block_size=7) == 8
@@ -16,3 +16,21 @@ def test_parse_fasta_str(path):
     abpath = os.path.join(os.path.dirname(__file__), path)
     result = parse_fasta_str(open(abpath, 'r').read())
     assert len(result) > 0
+
+
+def test_iter_fasta_streams_records():
+    """Records are yielded in file order with incremental sha1 and length"""
+    import hashlib
+    import io
+    from dgparse.fasta.parse_fasta import iter_fasta
+    stream = io.BytesIO('>one linear\nACGT\nAcgtNN\n>two\r\nGGGG\r\n')
+    records = iter_fasta(stream)
+    first = next(records)
+    assert first['name'] == 'one'
+    assert first['is_circular'] is False
+    assert first['sequence']['seq'] == 'ACGTACGTNN'
+    assert first['sequence']['sha1'] == hashlib.sha1('ACGTACGTNN').hexdigest()
+    assert first['length'] == 10
+    second = next(records)
+    assert (second['name'], second['sequence']['seq']) == ('two', 'GGGG')
+    assert next(records, None) is None
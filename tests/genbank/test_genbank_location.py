@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Test parsing of feature location expressions
+"""
+import io
+
+import pytest
+
+from dgparse import exc
+from dgparse import genbank
+from dgparse.genbank.features import location as locations
+from dgparse.genbank.features.location import parse_location, Segment
+from dgparse.genbank.features.main import parse_coord
+
+
+@pytest.mark.parametrize("location,expected", [
+    ('467', [(466, 467, 1, False, False)]),
+    ('340..565', [(339, 565, 1, False, False)]),
+    ('<345..>500', [(344, 500, 1, True, True)]),
+    ('102.110', [(101, 110, 1, False, False)]),
+    ('123^124', [(122, 124, 1, False, False)]),
+    ('complement(34..126)', [(33, 126, -1, False, False)]),
+    ('join(12..78,134..202)', [(11, 78, 1, False, False),
+                               (133, 202, 1, False, False)]),
+    ('complement(join(2691..4571,4918..5163))',
+     [(4917, 5163, -1, False, False), (2690, 4571, -1, False, False)]),
+    ('join(complement(4918..5163),complement(2691..4571))',
+     [(4917, 5163, -1, False, False), (2690, 4571, -1, False, False)]),
+    ('order(1..10, complement(20..30))', [(0, 10, 1, False, False),
+                                          (19, 30, -1, False, False)]),
+    ('join(1..100,J00194.1:100..202)', [(0, 100, 1, False, False)]),
+    ('join(1..10,gap(20),31..40)', [(0, 10, 1, False, False),
+                                    (30, 40, 1, False, False)]),
+])
+def test_parse_location(location, expected):
+    """Locations are parsed to segments in biological order"""
+    assert parse_location(location) == tuple(Segment(*seg) for seg in expected)
+
+
+@pytest.mark.parametrize("location", [
+    'join(1..10',
+    'frobnicate(1..10)',
+    '1..10)',
+])
+def test_invalid_location(location):
+    """Malformed locations raise InvalidLocation"""
+    with pytest.raises(exc.InvalidLocation):
+        parse_location(location)
+
+
+def test_parse_location_is_cached():
+    """Repeated locations are served from the cache"""
+    first = parse_location('join(1..5,8..9)')
+    assert parse_location('join(1..5,8..9)') is first
+
+
+@pytest.mark.parametrize("location", [
+    '340..565',
+    '<345..>500',
+    'complement(34..126)',
+    'complement(<1..>9)',
+])
+def test_simple_range_matches_parser(location):
+    """Plain ranges skip the full parser but give the same segments"""
+    assert locations.SIMPLE_RANGE.match(location)
+    assert parse_location(location) == \
+        locations.LocationParser(location).parse()
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """A full cache drops its least recently used entries"""
+    calls = []
+
+    @locations.lru_cache(4)
+    def square(value):
+        calls.append(value)
+        return value * value
+
+    for value in (1, 2, 3, 4):
+        square(value)
+    square(1)  # now the most recently used
+    square(5)
+    assert sorted(square.cache) == [1, 5]
+    assert square(1) == 1
+    assert calls == [1, 2, 3, 4, 5]
+
+
+def test_parse_coord_spans_segments():
+    """The feature span runs from the first to the last written segment"""
+    coord = parse_coord('complement(join(2691..4571,4918..5163))')
+    assert (coord['start'], coord['end'], coord['strand']) == (2690, 5163, -1)
+    assert len(coord['segments']) == 2
+    wrapped = parse_coord('join(5000..5386,1..100)')
+    assert (wrapped['start'], wrapped['end'], wrapped['strand']) == (4999, 100, 1)
+
+
+def test_parse_coord_falls_back_to_digits():
+    """Locations outside the grammar still yield their outer positions"""
+    coord = parse_coord('complement(1..10 maybe 20)')
+    assert (coord['start'], coord['end'], coord['strand']) == (0, 20, -1)
+    coord = parse_coord('join(1..10,gap(20)')
+    assert (coord['start'], coord['end']) == (0, 10)
+    with pytest.raises(exc.NullCoordinates):
+        parse_coord('nowhere')
+
+
+@pytest.mark.parametrize("location,expected", [
+    ('gap(10)', None),
+    ('gap()', None),
+    ('join(J00194.1:100..202,1..100)', (0, 100, 1)),
+    ('complement(join(J00194.1:100..202,5..50))', (4, 50, -1)),
+    ('J00194.1:100..202', None),
+])
+def test_parse_coord_without_local_spans(location, expected):
+    """Gaps and remote spans are never local coordinates"""
+    if expected is None:
+        with pytest.raises(exc.NullCoordinates):
+            parse_coord(location)
+    else:
+        coord = parse_coord(location)
+        assert (coord['start'], coord['end'], coord['strand']) == expected
+
+
+def test_features_without_local_location_are_skipped():
+    """Gap and remote features are left out, not the whole record"""
+    record = '\n'.join([
+        'LOCUS       gapped 60 bp    DNA     linear SYN 01-JAN-2016',
+        'FEATURES             Location/Qualifiers',
+        '     gap             gap(10)',
+        '                     /estimated_length=10',
+        '     misc_feature    join(1..20,J00194.1:100..202)',
+        '                     /label="local"',
+        '     misc_feature    J00194.1:100..202',
+        '                     /label="remote"',
+        '     misc_feature    complement(21..30)',
+        '                     /label="after"',
+        'ORIGIN',
+        '        1 ' + ' '.join(['acgtacgtac'] * 6),
+        '//',
+    ]) + '\n'
+    ret = genbank.parse(io.BytesIO(record))
+    spans = [(feature['dnafeature']['name'], feature['start'], feature['end'])
+             for feature in ret['dnafeatures']]
+    assert spans == [('local', 0, 20), ('after', 20, 30)]
+
+
+def test_location_continues_onto_next_line():
+    """Long locations wrapped over several lines are joined before parsing"""
+    from dgparse.genbank.features.main import parse_feature_lines
+    table = [
+        '     CDS             join(1..10,20..30,\n',
+        '                     40..50)\n',
+        '                     /label="spliced"\n',
+        'ORIGIN\n',
+    ]
+    lines = iter(table)
+    out = {'features': []}
+    rest = parse_feature_lines(next(lines), lines, out)
+    assert rest == 'ORIGIN\n'
+    feature = out['features'][0]
+    assert (feature['start'], feature['end']) == (0, 50)
+    assert len(feature['segments']) == 3
+    assert feature['name'] == 'spliced'
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Test the GenBank parsing loop on records longer than the recursion limit
+"""
+import io
+import sys
+
+import pytest
+
+from dgparse import genbank
+from dgparse import sequtils
+from dgparse.genbank import main
+
+
+def make_record(n_features, n_rows):
+    'Build a GenBank record with n_features features and n_rows ORIGIN lines'
+    lines = ['LOCUS       long {0} bp    DNA     circular SYN 01-JAN-2016'.format(n_rows * 60),
+             'FEATURES             Location/Qualifiers']
+    for number in range(n_features):
+        lines.append('     misc_feature    {0}..{1}'.format(number + 1, number + 20))
+        lines.append('                     /label="feature {0}"'.format(number))
+    lines.append('ORIGIN')
+    for row in range(n_rows):
+        lines.append('{0:>9} {1}'.format(row * 60 + 1, ' '.join(['acgtacgtac'] * 6)))
+    lines.append('//')
+    return '\n'.join(lines) + '\n'
+
+
+def test_init_has_no_depth_limit():
+    """Records far longer than the recursion limit are parsed"""
+    n_rows = sys.getrecursionlimit() * 5
+    record = make_record(sys.getrecursionlimit() * 2, n_rows)
+    out = main.init(io.BytesIO(record))
+    assert out['locus']['name'] == 'long'
+    assert len(out['features']) == sys.getrecursionlimit() * 2
+    assert len(out['origin']) == n_rows * 60
+
+
+def test_parse_long_record():
+    """genbank.parse returns every feature of a long record"""
+    record = make_record(2000, 100)
+    ret = genbank.parse(io.BytesIO(record))
+    assert len(ret['dnafeatures']) == 2000
+    assert ret['dnafeatures'][-1]['dnafeature']['name'] == 'feature 1999'
+
+
+def test_iter_genbank_yields_each_record():
+    """Concatenated records are yielded one at a time, in order"""
+    header = 'GBSYN1.SEQ          Genetic Sequence Data Bank\n\n'
+    records = [make_record(n + 1, 2).replace('long', 'rec{0}'.format(n))
+               for n in range(3)]
+    stream = io.BytesIO(header + ''.join(records))
+    parsed = genbank.iter_genbank(stream)
+    first = next(parsed)
+    assert first['locus']['name'] == 'rec0'
+    rest = list(parsed)
+    assert [rec['locus']['name'] for rec in rest] == ['rec1', 'rec2']
+    assert [len(rec['dnafeatures']) for rec in rest] == [2, 3]
+
+
+def test_init_stops_at_first_record():
+    """main.init only parses the first LOCUS ... // block"""
+    stream = io.BytesIO(make_record(1, 1) + make_record(5, 1))
+    out = main.init(stream)
+    assert len(out['features']) == 1
+
+
+def test_parse_locus_section_only():
+    """Only the requested sections are parsed"""
+    record = make_record(3, 2).replace('acgtacgtac', 'not bases!')
+    ret = genbank.parse(io.BytesIO(record), sections=('LOCUS',))
+    assert ret['locus']['name'] == 'long'
+    assert ret['is_circular'] is True
+    assert 'sequence' not in ret
+    assert 'dnafeatures' not in ret
+
+
+def test_parse_features_without_origin():
+    """Features are located and named but carry no pattern without ORIGIN"""
+    ret = genbank.parse(io.BytesIO(make_record(3, 2)),
+                        sections=('LOCUS', 'FEATURES'))
+    assert 'sequence' not in ret
+    annotation = ret['dnafeatures'][2]
+    assert (annotation['start'], annotation['end']) == (2, 22)
+    assert annotation['dnafeature']['name'] == 'feature 2'
+    assert 'pattern' not in annotation['dnafeature']
+
+
+def test_unknown_section():
+    """Sections without a header function are refused"""
+    with pytest.raises(ValueError):
+        main.init(io.BytesIO(make_record(1, 1)), sections=('REFERENCE',))
+
+
+def test_canonical_sha1_on_request():
+    """Circular records only get a canonical_sha1 when asked for"""
+    record = make_record(1, 2)
+    assert 'canonical_sha1' not in genbank.parse(
+        io.BytesIO(record))['sequence']
+    ret = genbank.parse(io.BytesIO(record), canonical=True)
+    assert ret['sequence']['canonical_sha1'] == \
+        sequtils.canonical_sha1(ret['sequence']['bases'])
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Test decoding of the GenBank ORIGIN section
+"""
+import io
+
+import pytest
+
+from dgparse import exc
+from dgparse import genbank
+from dgparse.genbank.origin import parse_origin_lines
+
+
+def decode(text):
+    lines = iter(text.splitlines(True))
+    out = {'origin': ''}
+    rest = parse_origin_lines(next(lines), lines, out)
+    return out['origin'], rest
+
+
+def test_origin_strips_coordinates_and_spacing():
+    """Coordinates, spaces and line endings are removed, bases upper cased"""
+    bases, rest = decode('        1 acgtacgtac gtnnry\r\n       17 ttaa\r\n//\r\n')
+    assert bases == 'ACGTACGTACGTNNRYTTAA'
+    assert rest == '//\r\n'
+
+
+def test_origin_stops_at_next_header():
+    """A header line that is not sequence ends the ORIGIN section"""
+    bases, rest = decode('        1 acgt\nLOCUS       next\n')
+    assert bases == 'ACGT'
+    assert rest.startswith('LOCUS')
+
+
+def test_origin_keeps_other_symbols():
+    """Numbered lines are taken as written, gaps included"""
+    bases, rest = decode('        1 acgtacgtac gtac--gtac\n//\n')
+    assert bases == 'ACGTACGTACGTAC--GTAC'
+    assert rest == '//\n'
+
+
+def test_origin_rejects_illegal_characters_when_strict():
+    """The alphabet is validated once the section is decoded, on request"""
+    record = '\n'.join([
+        'LOCUS       strict 15 bp    DNA     linear SYN 01-JAN-2016',
+        'ORIGIN',
+        '        1 acgtacgtac acgzt',
+        '//',
+    ]) + '\n'
+    assert genbank.parse(io.BytesIO(record))['sequence']['bases'] == \
+        'ACGTACGTACACGZT'
+    with pytest.raises(exc.ParserException) as excinfo:
+        genbank.parse(io.BytesIO(record), strict=True)
+    assert '13' in str(excinfo.value)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Test lazily materialized dnafeature annotations
+"""
+import json
+import os
+
+import pytest
+
+from dgparse import genbank
+from dgparse.genbank import views
+
+DATA = os.path.join(os.path.dirname(__file__), '../../data/genbank/')
+
+
+@pytest.mark.parametrize("file_name", [
+    'PX330.gbk',
+    'span_circular.gb',
+    '01-lentiCRISPRv2-add.gb',
+])
+def test_lazy_matches_eager(file_name):
+    """Lazy annotations compare equal to the eagerly built dicts"""
+    with open(DATA + file_name, 'rb') as input_fh:
+        eager = genbank.parse(input_fh)
+    with open(DATA + file_name, 'rb') as input_fh:
+        lazy = genbank.parse(input_fh, lazy=True)
+    assert len(lazy['dnafeatures']) == len(eager['dnafeatures'])
+    for view, annotation in zip(lazy['dnafeatures'], eager['dnafeatures']):
+        assert isinstance(view, views.FeatureView)
+        assert view['dnafeature']['length'] == annotation['dnafeature']['length']
+        assert view == annotation
+        assert dict(view['dnafeature']) == annotation['dnafeature']
+    json.dumps(views.materialize(lazy['dnafeatures']))
+
+
+def test_pattern_is_extracted_on_first_access():
+    """Pattern bases and sha1 are computed once, when first looked up"""
+    with open(DATA + 'PX330.gbk', 'rb') as input_fh:
+        ret = genbank.parse(input_fh, lazy=True)
+    dnafeature = ret['dnafeatures'][0]['dnafeature']
+    pattern = dnafeature['pattern']
+    assert dnafeature['name'] == 'CBh'
+    assert dnafeature['length'] == 799
+    assert pattern.is_pending('bases') and pattern.is_pending('sha1')
+    sha1 = pattern['sha1']
+    assert not pattern.is_pending('bases')
+    assert pattern['sha1'] is sha1
+    assert len(pattern['bases']) == 799
+
+
+def test_annotation_is_built_on_first_use():
+    """Views keep only the parsed feature until they are first read"""
+    with open(DATA + 'PX330.gbk', 'rb') as input_fh:
+        ret = genbank.parse(input_fh, lazy=True)
+    first, second = ret['dnafeatures'][:2]
+    assert not first.is_built() and not second.is_built()
+    assert first['start'] == 439
+    assert first.is_built() and not second.is_built()
+    assert first['dnafeature']['pattern'].is_pending('bases')
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for annotating molecules from a feature library
+"""
+import io
+import os
+
+import pytest
+
+from dgparse import annotate
+from dgparse import delimited
+from dgparse import sequtils
+
+
+@pytest.fixture(scope='module')
+def library():
+    path = os.path.join(os.path.dirname(__file__),
+                        '../data/delimited/dnafeature.csv')
+    with open(path, 'rb') as open_file:
+        records = delimited.parse(open_file)
+    return dict((record['name'], record) for record in records)
+
+
+@pytest.fixture(scope='module')
+def annotator(library):
+    return annotate.Annotator(library.values())
+
+
+def found(annotations):
+    return sorted((annotation['dnafeature']['name'], annotation['start'],
+                   annotation['end'], annotation['strand'])
+                  for annotation in annotations)
+
+
+def test_annotate_both_strands(library, annotator):
+    fxa = library['FXa']['pattern']['bases']
+    stop = library['293 Stop']['pattern']['bases']
+    bases = 'TTTT' + fxa + 'GGGG' + sequtils.get_reverse_complement(stop)
+    annotations = annotator.annotate(bases)
+    assert found(annotations) == [('293 Stop', 20, 34, -1),
+                                  ('FXa', 4, 16, 1)]
+    feature = annotations[0]['dnafeature']
+    assert feature['category'] == 'CDS'
+    assert feature['pattern']['bases'] == fxa
+    assert feature['length'] == 12
+    assert annotations[0]['segments'][0]['start'] == 4
+    # each annotation holds its own copy of the library feature
+    assert all(feature is not library_feature
+               for library_feature in annotator.features)
+
+
+def test_annotate_across_origin(library, annotator):
+    fxa = library['FXa']['pattern']['bases']
+    bases = fxa[5:] + 'ACACACACAC' + fxa[:5]
+    assert annotator.annotate(bases, is_circular=False) == []
+    assert found(annotator.annotate(bases, is_circular=True)) == [
+        ('FXa', 17, 7, 1)]
+    bases = sequtils.get_reverse_complement(bases)
+    assert found(annotator.annotate(bases, is_circular=True)) == [
+        ('FXa', 15, 5, -1)]
+
+
+def test_dump_and_load(library, annotator):
+    bases = 'A' + library['FXa']['pattern']['bases'].lower() + 'NNN'
+    buf = io.BytesIO()
+    annotator.dump(buf)
+    buf.seek(0)
+    loaded = annotate.Annotator.load(buf)
+    assert loaded.transitions == annotator.transitions
+    assert found(loaded.annotate(bases)) == found(annotator.annotate(bases))
+    record = annotate.annotate_record(
+        {'sequence': {'bases': bases}, 'is_circular': True}, loaded)
+    assert found(record['dnafeatures']) == [('FXa', 1, 13, 1)]
@@ -0,0 +1,96 @@
+"""
+Test transparent gzip and BGZF decompression of parser input
+"""
+import gzip
+import os
+import struct
+import zlib
+
+import pytest
+
+import dgparse
+from dgparse import compression
+from dgparse.exc import FormatException, NoParserException
+
+DATA = os.path.join(os.path.dirname(__file__), '../data')
+
+
+def bgzip(data, block_size=1000):
+    """Compress data into BGZF blocks of block_size bytes and an EOF block"""
+    blocks = []
+    for offset in range(0, len(data), block_size) + [len(data)]:
+        chunk = data[offset:offset + block_size]
+        deflate = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        payload = deflate.compress(chunk) + deflate.flush()
+        header = struct.pack('<4BI2BH2BHH', 31, 139, 8, 4, 0, 0, 255, 6,
+                             66, 67, 2, len(payload) + 25)
+        trailer = struct.pack('<II', zlib.crc32(chunk) & 0xffffffff,
+                              len(chunk))
+        blocks.append(header + payload + trailer)
+    return ''.join(blocks)
+
+
+@pytest.fixture
+def genbank_bytes():
+    with open(os.path.join(DATA, 'genbank/pBR322.genbank'), 'rb') as source:
+        return source.read()
+
+
+@pytest.mark.parametrize('workers', (1, 3))
+def test_bgzf_reader(tmpdir, genbank_bytes, workers, monkeypatch):
+    monkeypatch.setattr(compression, 'BLOCKS_PER_BATCH', 2)
+    path = str(tmpdir.join('pBR322.genbank.gz'))
+    with open(path, 'wb') as out:
+        out.write(bgzip(genbank_bytes))
+    with compression.open_file(path, workers) as reader:
+        assert isinstance(reader, compression.BgzfReader)
+        assert reader.read(10) == genbank_bytes[:10]
+        assert reader.read(2500) == genbank_bytes[10:2510]
+        assert reader.read() == genbank_bytes[2510:]
+        assert reader.read() == ''
+        reader.seek(0)
+        assert reader.read() == genbank_bytes
+    with gzip.open(path) as plain:  # BGZF is valid multi-member gzip
+        assert plain.read() == genbank_bytes
+
+
+@pytest.mark.parametrize('offset', [-40, -100, -200, -300])
+def test_corrupt_bgzf_block(tmpdir, genbank_bytes, offset):
+    data = bytearray(bgzip(genbank_bytes))
+    data[offset] ^= 0xff  # inside the last data block's deflate stream
+    path = str(tmpdir.join('corrupt.gb'))
+    with open(path, 'wb') as out:
+        out.write(data)
+    with pytest.raises(FormatException):
+        with compression.open_file(path, 1) as reader:
+            reader.read()
+    with pytest.raises(FormatException):
+        list(dgparse.load_iter('dnamolecule', [path]))
+
+
+@pytest.mark.parametrize('name,compress', (
+    ('pBR322.gbk.gz', lambda data: bgzip(data)),
+    ('pBR322.gb.gz', None),
+    ('pBR322.gb', lambda data: bgzip(data)),  # detected by magic bytes
+))
+def test_load_iter_compressed(tmpdir, genbank_bytes, name, compress):
+    path = str(tmpdir.join(name))
+    if compress is None:
+        with gzip.open(path, 'wb') as out:
+            out.write(genbank_bytes)
+    else:
+        with open(path, 'wb') as out:
+            out.write(compress(genbank_bytes))
+    plain = str(tmpdir.join('pBR322.gb.plain.gb'))
+    with open(plain, 'wb') as out:
+        out.write(genbank_bytes)
+    expected = list(dgparse.load_iter('plasmid', [plain]))
+    assert list(dgparse.load_iter('plasmid', [path])) == expected
+    assert expected[0][0]['sequence']['bases']
+
+
+def test_get_parser():
+    assert dgparse.get_parser('ref.fa.gz') is dgparse.PARSERS['.fa']
+    assert dgparse.get_parser('dump.seq.bgz') is dgparse.PARSERS['.seq']
+    with pytest.raises(NoParserException):
+        dgparse.get_parser('notes.txt.gz')
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for CRISPR guide scanning
+"""
+import gc
+
+import pytest
+
+from dgparse import crispr
+from dgparse import schema
+from dgparse import sequtils
+
+SPACER = 'GACGCATAAAGATGAGACGC'
+
+
+def test_spcas9_guide_forward():
+    bases = 'CCTA' + SPACER + 'TGGAAC' + 'A' * 10
+    guides = [guide for guide in crispr.find_guides(bases)
+              if guide['strand'] == 1]
+    guide, = guides
+    assert (guide['prefix'], guide['protospacer'], guide['pam'],
+            guide['suffix']) == ('CCTA', SPACER, 'TGG', 'AAC')
+    assert (guide['start'], guide['end']) == (4, 24)
+    # blunt, 3 bases from the PAM
+    assert guide['cut_site'] == guide['topcut'] == guide['btmcut'] == 21
+    assert guide['coordinates'] == {'start_end': [4, 24], 'strand': 1}
+    assert set(guide) - set(schema.GuideRnaCutSchema().fields) == \
+        set(['start', 'end', 'strand'])
+
+
+def test_spcas9_guide_reverse():
+    bases = sequtils.get_reverse_complement('CCTA' + SPACER + 'TGGAAC')
+    guide, = [guide for guide in crispr.find_guides(bases)
+              if guide['protospacer'] == SPACER]
+    assert (guide['strand'], guide['start'], guide['end']) == (-1, 6, 26)
+    assert guide['cut_site'] == guide['topcut'] == 9
+    assert guide['prefix'] == 'CCTA'
+    assert guide['suffix'] == 'AAC'
+
+
+def test_cas12a_staggered_cut():
+    spacer = SPACER + 'ACG'
+    bases = 'GG' + 'TTTA' + spacer + 'GG'
+    guide, = [guide for guide in crispr.find_guides(bases, crispr.CAS12A)
+              if guide['strand'] == 1]
+    assert (guide['pam'], guide['protospacer']) == ('TTTA', spacer)
+    assert (guide['start'], guide['topcut'], guide['btmcut']) == (6, 24, 29)
+    assert guide['prefix'] == 'GG'
+
+
+@pytest.mark.parametrize('nuclease', [crispr.SPCAS9, crispr.SACAS9,
+                                      crispr.CAS12A])
+def test_guides_across_origin(nuclease):
+    '''A circular molecule has the guides of all its rotations'''
+    bases = 'ATGCGGTTTACCAGTGGAGTTTCGAATTGGCAGTACCGTTTGAAGGGATCAAGTGGTC'
+    expected = crispr.find_guides(bases, nuclease, is_circular=True)
+    assert len(expected) > len(crispr.find_guides(bases, nuclease))
+    length = len(bases)
+    for shift in (1, 17, 40):
+        rotated = bases[shift:] + bases[:shift]
+        guides = crispr.find_guides(rotated, nuclease, is_circular=True)
+        moved = sorted(((guide['start'] + shift) % length, guide['strand'],
+                        guide['protospacer'], guide['prefix'],
+                        guide['suffix']) for guide in guides)
+        assert moved == sorted((guide['start'], guide['strand'],
+                                guide['protospacer'], guide['prefix'],
+                                guide['suffix']) for guide in expected)
+
+
+def test_no_guides_through_ambiguous_bases():
+    bases = 'CCTA' + SPACER[:10] + 'N' + SPACER[11:] + 'TGGAAC'
+    assert [guide for guide in crispr.find_guides(bases)
+            if guide['strand'] == 1] == []
+
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_gc_state_restored(enabled):
+    was_enabled = gc.isenabled()
+    (gc.enable if enabled else gc.disable)()
+    try:
+        with crispr.gc_paused():
+            assert not gc.isenabled()
+        assert gc.isenabled() == enabled
+    finally:
+        (gc.enable if was_enabled else gc.disable)()
+
+
+def test_gc_paused_only_on_request(monkeypatch):
+    calls = []
+    monkeypatch.setattr(crispr.gc, 'disable', lambda: calls.append(1))
+    bases = 'CCTA' + SPACER + 'TGGAAC'
+    crispr.find_guides(bases)
+    assert calls == []
+    crispr.find_guides(bases, pause_gc=True)
+    assert calls == [1]
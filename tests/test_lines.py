@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the newline normalizing line source.
+"""
+import io
+import os
+import random
+
+import pytest
+
+from dgparse import genbank
+from dgparse.lines import iter_lines
+
+
+@pytest.mark.parametrize("text", [
+    'one\ntwo\nthree',
+    'one\r\ntwo\r\nthree',
+    'one\rtwo\rthree',
+    'one\r\ntwo\rthree',
+])
+def test_line_endings_are_normalized(text):
+    """Unix, Windows and Mac line endings all yield the same lines"""
+    for block_size in (1, 2, 3, 4, 1024):
+        lines = list(iter_lines(io.BytesIO(text), block_size))
+        assert lines == ['one\n', 'two\n', 'three']
+
+
+def test_crlf_across_blocks():
+    """A \\r\\n split between two reads is a single line ending"""
+    lines = list(iter_lines(io.BytesIO('ab\r\ncd\r\n\r\n'), 3))
+    assert lines == ['ab\n', 'cd\n', '\n']
+
+
+@pytest.mark.parametrize("text,last", [
+    ('one\ntwo', 'two'),
+    ('one\ntwo\r', 'two\n'),
+    ('one\ntwo\r\n', 'two\n'),
+])
+def test_last_line_ending_is_kept_as_is(text, last):
+    """An unterminated last line gets no \\n added"""
+    for block_size in (1, 3, 1024):
+        lines = list(iter_lines(io.BytesIO(text), block_size))
+        assert lines == ['one\n', last]
+
+
+def test_matches_splitting_the_whole_text():
+    """Any mix of endings and line lengths splits as if read at once"""
+    rand = random.Random(0)
+    for _ in range(200):
+        text = ''.join(rand.choice(['a', 'b', '\r', '\n', '\r\n'])
+                       for _ in range(rand.randint(0, 40)))
+        expected = text.replace('\r\n', '\n').replace('\r', '\n')
+        for block_size in (1, 2, 5):
+            lines = list(iter_lines(io.BytesIO(text), block_size))
+            assert lines == expected.splitlines(True), repr(text)
+
+
+def test_long_line_over_many_blocks():
+    """A line longer than a block is joined once, whole"""
+    text = '>x\n' + 'A' * 10000 + '\n>y'
+    assert list(iter_lines(io.BytesIO(text), 7)) == \
+        ['>x\n', 'A' * 10000 + '\n', '>y']
+
+
+def test_iter_lines_is_lazy():
+    """Lines are yielded before the whole file has been read"""
+    stream = io.BytesIO('first\n' + 'x' * 100 + '\n')
+    lines = iter_lines(stream, 8)
+    assert next(lines) == 'first\n'
+    assert stream.tell() < 100
+
+
+def test_parse_cr_only_genbank():
+    """GenBank files with classic Mac line endings are parsed"""
+    path = os.path.join(os.path.dirname(__file__), '../data/genbank/pBR322.genbank')
+    with open(path, 'rb') as input_fh:
+        ret = genbank.parse(input_fh)
+    assert ret['locus']['name'] == 'SYNPBR322'
+    assert len(ret['sequence']['bases']) == 4361
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the off-target search index
+"""
+import random
+
+import numpy as np
+import pytest
+
+from dgparse import crispr
+from dgparse import offtarget
+from dgparse import schema
+from dgparse import sequtils
+
+SPACER = 'GACGCATAAAGATGAGACGC'
+FILLER = 'ATATATATATATATATATATATATAT'
+
+
+def mutate(bases, positions):
+    bases = list(bases)
+    for position in positions:
+        bases[position] = 'C' if bases[position] != 'C' else 'G'
+    return ''.join(bases)
+
+
+def brute_force(bases, guide, mismatches):
+    found = set()
+    for strand, query in ((1, guide),
+                          (-1, sequtils.get_reverse_complement(guide))):
+        for start in range(len(bases) - len(query) + 1):
+            site = bases[start:start + len(query)]
+            distance = sum(base != code or base not in 'ACGT'
+                           for base, code in zip(site, query))
+            if distance <= mismatches:
+                found.add((start, strand, distance))
+    return found
+
+
+def test_find_mismatched_sites_on_both_strands():
+    site = mutate(SPACER, [0, 19])
+    bases = FILLER + SPACER + FILLER + \
+        sequtils.get_reverse_complement(site) + FILLER
+    index = offtarget.OffTargetIndex.build([('target', bases, False)])
+    exact, mismatched = index.find(SPACER)
+    assert (exact.start, exact.end, exact.strand, exact.mismatches) == \
+        (26, 46, 1, 0)
+    assert (mismatched.start, mismatched.end, mismatched.strand) == \
+        (72, 92, -1)
+    # positions are counted along the guide
+    assert (mismatched.mismatches, mismatched.positions) == (2, (0, 19))
+    assert index.find(SPACER, mismatches=1) == [exact]
+
+
+def test_ambiguous_bases_are_mismatches():
+    bases = FILLER + SPACER[:5] + 'N' + SPACER[6:] + FILLER
+    index = offtarget.OffTargetIndex.build([('target', bases, False)])
+    hit, = index.find(SPACER)
+    assert (hit.mismatches, hit.positions) == (1, (5,))
+    assert index.find(SPACER, mismatches=0) == []
+
+
+def test_sites_across_origin():
+    bases = SPACER[8:] + FILLER + SPACER[:8]
+    index = offtarget.OffTargetIndex.build([('plasmid', bases, True),
+                                            ('linear', bases, False)])
+    hit, = index.find(SPACER)
+    assert (hit.molecule, hit.start, hit.end) == ('plasmid', 38, 12)
+
+
+def test_pam_required():
+    site = mutate(SPACER, [3])
+    bases = FILLER + SPACER + 'TGG' + FILLER + site + 'TAA' + FILLER
+    index = offtarget.OffTargetIndex.build([('target', bases, False)])
+    assert len(index.find(SPACER)) == 2
+    hit, = index.find(SPACER, pam='NGG')
+    assert hit.start == 26
+    # and on the reverse strand
+    index = offtarget.OffTargetIndex.build(
+        [('target', sequtils.get_reverse_complement(bases), False)])
+    hit, = index.find(SPACER, pam='NGG')
+    assert hit.strand == -1
+
+
+@pytest.mark.parametrize('mismatches', [0, 1, 4])
+def test_matches_brute_force(mismatches):
+    rand = random.Random(mismatches)
+    bases = ''.join(rand.choice('ACGT') for _ in range(3000))
+    index = offtarget.OffTargetIndex.build([('random', bases, False)])
+    for start in range(0, 2900, 300):
+        guide = mutate(bases[start:start + 20], [rand.randrange(20)])
+        found = set((hit.start, hit.strand, hit.mismatches)
+                    for hit in index.find(guide, mismatches))
+        assert found == brute_force(bases, guide, mismatches)
+
+
+def test_save_and_load_memory_mapped(tmpdir):
+    bases = FILLER + SPACER + FILLER + mutate(SPACER, [7]) + FILLER
+    index = offtarget.OffTargetIndex.build([('target', bases, True)])
+    directory = str(tmpdir.join('index'))
+    index.save(directory)
+    loaded = offtarget.OffTargetIndex.load(directory)
+    assert isinstance(loaded.positions, np.memmap)
+    assert loaded.find(SPACER) == index.find(SPACER)
+
+
+def test_too_many_mismatches_for_seeds():
+    index = offtarget.OffTargetIndex.build([('target', SPACER, False)])
+    with pytest.raises(ValueError):
+        index.find(SPACER, mismatches=5)
+
+
+def test_score_guides():
+    bases = FILLER + SPACER + 'AGG' + FILLER
+    guide, = [guide for guide in crispr.find_guides(bases)
+              if guide['protospacer'] == SPACER]
+    index = offtarget.OffTargetIndex.build([('target', bases, False)])
+    offtarget.score_guides([guide], index)
+    assert guide['specificity_score'] == 100
+    offtarget_, = guide['offtargets']
+    assert offtarget_['coordinates'] == {'start_end': [26, 46], 'strand': 1}
+    assert set(offtarget_) - set(schema.GuideRnaCutSchema().fields) == \
+        set(['start', 'end', 'strand', 'mismatches'])
+    # a second site, one mismatch away next to a PAM, lowers the score
+    bases += mutate(SPACER, [19]) + 'CGG' + FILLER
+    index = offtarget.OffTargetIndex.build([('target', bases, False)])
+    offtarget.score_guides([guide], index)
+    assert len(guide['offtargets']) == 2
+    assert 0 < guide['specificity_score'] < 100
+
+
+def test_score_guides_skips_only_the_guides_own_site():
+    bases = FILLER + SPACER + 'AGG' + FILLER
+    guide, = [guide for guide in crispr.find_guides(bases)
+              if guide['protospacer'] == SPACER]
+    # an exact copy elsewhere is an off-target, scored as such
+    index = offtarget.OffTargetIndex.build([('target', bases, False),
+                                            ('copy', bases, False)])
+    offtarget.score_guides([guide], index, molecule='target')
+    assert len(guide['offtargets']) == 2
+    assert guide['specificity_score'] == 50
+    # the guide's site is not in the reference at all
+    index = offtarget.OffTargetIndex.build(
+        [('other', 'C' + bases, False)])
+    offtarget.score_guides([guide], index)
+    assert guide['specificity_score'] == 50
+    hit, = index.find(SPACER)
+    assert offtarget.specificity_score([hit], ('other', 27, 1)) == 100
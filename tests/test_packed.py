@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the two bit packed sequence
+"""
+import hashlib
+import io
+import os
+import random
+
+import pytest
+
+from dgparse import genbank, sequtils
+from dgparse.fasta.parse_fasta import iter_fasta
+from dgparse.packed import PackedSequence
+
+DATA = os.path.join(os.path.dirname(__file__), '../data')
+
+
+@pytest.mark.parametrize("bases", [
+    '',
+    'A',
+    'ACGTN',
+    'acgtacgtac',
+    'ACGTRYKMSWBDHVN' * 3,
+    ''.join(random.Random(0).choice('ACGTACGTACGTN') for _ in range(1001)),
+])
+def test_round_trip(bases):
+    '''Slices, str, sha1 and the reverse complement match the str'''
+    packed = PackedSequence(bases)
+    canonical = bases.upper()
+    assert len(packed) == len(canonical)
+    assert str(packed) == canonical and packed == canonical
+    assert packed.sha1() == hashlib.sha1(canonical).hexdigest()
+    for start in range(0, len(canonical), 7):
+        for end in range(start, len(canonical) + 2, 5):
+            assert packed[start:end] == canonical[start:end]
+    assert packed[-3:] == canonical[-3:]
+    assert packed[::-1] == canonical[::-1]
+    reverse = packed.reverse_complement()
+    assert isinstance(reverse, PackedSequence)
+    assert str(reverse) == ''.join(sequtils.ASCII_DNA_COMP[str(base)]
+                                   for base in reversed(canonical))
+
+def test_indexing_and_size():
+    packed = PackedSequence(u'GATTACA' * 1000)
+    assert packed[0] == 'G' and packed[-1] == 'A'
+    with pytest.raises(IndexError):
+        packed[7000]
+    assert packed.nbytes() == 1750
+    assert PackedSequence('ACGN') != PackedSequence('ACGA')
+
+
+def test_ambiguity_runs():
+    bases = 'ACGT' * 10 + 'N' * 100000 + 'RRY' + 'ACGT' * 10
+    packed = PackedSequence(bases)
+    # one run for the gap, two for RRY
+    assert list(packed.lengths) == [100000, 2, 1]
+    assert packed.nbytes() < len(bases) // 3
+    for start, end in ((38, 42), (50, 60), (100030, 100050), (0, len(bases)),
+                       (100040, 100041), (100042, 100043)):
+        assert packed[start:end] == bases[start:end]
+
+
+def test_parsers_emit_packed_sequences():
+    stream = io.BytesIO('>one\nACGTN\nGGCC\n')
+    record = next(iter_fasta(stream, packed=True))
+    assert isinstance(record['sequence']['seq'], PackedSequence)
+    assert record['sequence']['seq'] == 'ACGTNGGCC'
+    assert record['sequence']['sha1'] == hashlib.sha1('ACGTNGGCC').hexdigest()
+    path = os.path.join(DATA, 'genbank/pBR322.genbank')
+    with open(path, 'rb') as plain, open(path, 'rb') as compact:
+        expected = genbank.parse(plain)
+        result = genbank.parse(compact, packed=True)
+    assert isinstance(result['sequence']['bases'], PackedSequence)
+    assert result == expected
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for restriction site scanning
+"""
+import os
+
+import pytest
+
+import dgparse
+from dgparse import genbank
+from dgparse import restriction
+from dgparse import sequtils
+
+PBR322 = os.path.join(os.path.dirname(__file__),
+                      '../data/genbank/pBR322.genbank')
+
+
+@pytest.fixture(scope='module')
+def catalogue():
+    return restriction.Catalogue()
+
+
+@pytest.fixture(scope='module')
+def pbr322():
+    with open(PBR322) as open_file:
+        return genbank.parse(open_file)
+
+
+def test_digest_pbr322(catalogue, pbr322):
+    digest = catalogue.digest(pbr322['sequence']['bases'], True)
+    sites = dict((site['nuclease']['name'], site)
+                 for site in digest['restrictionsites'])
+    # the well known sites of the pBR322 map, numbered from 1
+    for name, position in (('HindIII', 29), ('BamHI', 375), ('SalI', 651),
+                           ('PstI', 3607), ('EcoRI', 4359)):
+        assert name in digest['unique_cutters']
+        assert sites[name]['start'] + 1 == position
+    # EcoRI spans the origin, G^AATTC cut in both strands
+    assert (sites['EcoRI']['end'], sites['EcoRI']['topcut'],
+            sites['EcoRI']['btmcut']) == (3, 4359, 2)
+    assert sites['EcoRI']['nuclease']['overhang'] == 4
+    assert 'NotI' in digest['noncutters']
+    assert 'BglI' not in digest['unique_cutters'] + digest['noncutters']
+
+
+def test_type_iis_cuts_both_strands(catalogue):
+    # BsaI GGTCTC(1/5) cuts downstream, i.e. to the left on strand -1
+    bases = 'A' * 20 + 'GGTCTC' + 'A' * 20
+    site, = catalogue.find(bases)
+    assert (site['strand'], site['topcut'], site['btmcut']) == (1, 27, 31)
+    site, = catalogue.find(sequtils.get_reverse_complement(bases))
+    assert (site['strand'], site['topcut'], site['btmcut']) == (-1, 15, 19)
+    # too near the end of a linear molecule to be cut
+    assert catalogue.find('A' * 20 + 'GGTCTCAAAA') == []
+    sites = catalogue.find('A' * 20 + 'GGTCTCAAAA', is_circular=True)
+    assert [(site['topcut'], site['btmcut']) for site in sites] == [(27, 1)]
+
+
+def test_load_iter_restriction_stage(catalogue):
+    plasmid, _ = next(dgparse.load_iter('plasmid', [PBR322], catalogue))
+    assert 'EcoRI' in plasmid['properties']['unique_cutters']
+    assert plasmid['properties']['restrictionsites']
+    plasmid, _ = next(dgparse.load_iter('plasmid', [PBR322]))
+    assert 'restrictionsites' not in plasmid['properties']
@@ -76,3 +76,24 @@ def test_load_primer(case_name, expected, primer_collection):
         assert errors == {}
     else:
         assert errors
+
+
+def test_load_plasmid_computes_canonical_sha1():
+    """Plasmids numbered from a different origin share a canonical_sha1"""
+    plasmid_schema = schema.DnaPlasmidSchema(
+        context={'canonical_sha1': True})
+    bases = 'GATTACAGGCCTTAAGCTAGCT'
+    hashes = set()
+    for rotated in (bases, bases[7:] + bases[:7]):
+        plasmid, _ = plasmid_schema.load({'name': 'pTest',
+                                          'sequence': {'bases': rotated}})
+        hashes.add(plasmid['sequence']['canonical_sha1'])
+    assert len(hashes) == 1
+    construct, _ = schema.DnaConstructSchema(
+        context={'canonical_sha1': True}).load(
+            {'name': 'linear', 'sequence': {'bases': bases}})
+    assert 'canonical_sha1' not in construct['sequence']
+    # not computed unless asked for
+    plasmid, _ = schema.DnaPlasmidSchema().load(
+        {'name': 'pTest', 'sequence': {'bases': bases}})
+    assert 'canonical_sha1' not in plasmid['sequence']
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for degenerate motif search
+"""
+import pytest
+
+from dgparse import exc
+from dgparse import search
+
+
+def test_search_iupac_both_strands():
+    # BsaI GGTCTC on the forward strand, GAGACC (its complement) reverse
+    bases = 'AAGGTCTCAAAGAGACCAA'
+    assert search.search('GGTCTC', bases) == [
+        search.Hit(2, 8, 1, 0, 0), search.Hit(11, 17, -1, 0, 0)]
+    # an R matches A or G, an N in the sequence only matches N
+    assert [hit.start for hit in search.search('RAATTY', 'GAATTCCAATTT')] \
+        == [0]
+    assert search.search('GAATTC', 'GANTTC') == []
+    assert search.search('GANTTC', 'GANTTC') == [search.Hit(0, 6, 1, 0, 0)]
+
+
+def test_search_palindrome_once():
+    assert search.search('GAATTC', 'ttgaattctt') == [
+        search.Hit(2, 8, 1, 0, 0)]
+
+
+def test_search_mismatches():
+    bases = 'CCCCGAATTGCCCC'
+    assert search.search('GAATTC', bases) == []
+    hits = search.search('GAATTC', bases, mismatches=1)
+    assert search.Hit(4, 10, 1, 0, 1) in hits
+    assert all(hit.mismatches == 1 for hit in hits)
+
+
+def test_search_across_origin():
+    bases = 'TCCCCCCCCGAAT'
+    assert search.search('GAATTC', bases) == []
+    assert search.search('GAATTC', bases, is_circular=True) == [
+        search.Hit(9, 2, 1, 0, 0)]
+
+
+def test_matcher_several_patterns():
+    matcher = search.Matcher(['CCTNAGG', 'NGG'])
+    hits = list(matcher.find('ACCTAAGGT'))
+    assert [(hit.pattern, hit.start, hit.strand) for hit in hits] == [
+        (1, 1, -1), (0, 1, 1), (1, 5, 1)]
+
+
+def test_matcher_rejects_bad_patterns():
+    with pytest.raises(exc.IllegalCharacter):
+        search.Matcher(['GAAZTC'])
+    with pytest.raises(ValueError):
+        search.Matcher(['NGG'], mismatches=3)
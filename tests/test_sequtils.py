@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the sequence helpers
+"""
+import random
+
+import pytest
+
+from dgparse import sequtils
+
+
+@pytest.mark.parametrize("seq_in,delete,bases,illegal", [
+    (b'acgt NNry\r\n', sequtils.WHITESPACE, b'ACGTNNRY', []),
+    (u'acgt\nxx', u'\n', u'ACGTXX', []),
+    (b'AC-GT*a', sequtils.WHITESPACE, b'AC-GT*A', [2, 5]),
+    (u'ACé T', u' ', u'ACéT', [2]),
+    (b'{AC}/GT', b'{}/', b'ACGT', []),
+])
+def test_normalize_bases(seq_in, delete, bases, illegal):
+    '''Bases are upper cased and cleaned, illegal characters located'''
+    result = sequtils.normalize_bases(seq_in, delete)
+    assert result == (bases, illegal)
+    assert type(result[0]) is type(seq_in)
+
+
+def test_compute_sha1_normalizes_bases():
+    data = sequtils.compute_sha1({'bases': u'acgt\nacgt'})
+    assert data['bases'] == u'ACGTACGT'
+    assert data['sha1'] == '8088234919f30dd5d61b622260018dcb2bbe9cfe'
+
+
+@pytest.mark.parametrize("seq_in,complement", [
+    (b'ACGTRYKMBVDHNSWX', b'TGCAYRMKVBHDNSWX'),
+    (b'acgtrykmbvdhnswx', b'tgcayrmkvbhdnswx'),
+    (u'AcGtRy', u'TgCaYr'),
+])
+def test_get_complement_covers_iupac(seq_in, complement):
+    assert sequtils.get_complement(seq_in) == complement
+    assert sequtils.get_reverse_complement(seq_in) == complement[::-1]
+
+
+def test_reverse_complement_many():
+    patterns = [b'GATTACA', u'aaRN', b'', b'cgY']
+    assert sequtils.reverse_complement_many(patterns) == [
+        b'TGTAATC', u'NYtt', b'', b'Rcg']
+
+
+def test_as_bases_and_record_bases():
+    from dgparse.packed import PackedSequence
+    for bases in (b'ACGN', u'ACGN', PackedSequence(b'acgn')):
+        assert sequtils.as_bases(bases) == b'ACGN'
+        assert type(sequtils.as_bases(bases)) is str
+    assert sequtils.as_bases(u'AC\xe9') == b'AC?'
+    assert sequtils.record_bases({'sequence': {'bases': 'AC'}}) == 'AC'
+    assert sequtils.record_bases({'sequence': {'seq': u'GT'}}) == u'GT'
+    assert sequtils.record_bases({'name': 'empty'}) is None
+
+
+def test_matches_across_the_origin():
+    bases = sequtils.extend_circular(u'GATTACA', True, 4)
+    assert bases == b'GATTACAGAT'
+    assert sequtils.extend_circular(u'GATTACA', False, 4) == b'GATTACA'
+    assert sequtils.origin_span(2, 5, 7) == (2, 5)
+    assert sequtils.origin_span(5, 9, 7) == (5, 2)
+    assert sequtils.origin_span(7, 10, 7) is None  # seen again from 0
+    assert sequtils.origin_span(0, 8, 7) is None
+
+
+@pytest.mark.parametrize("is_circular", [True, False])
+def test_sequence_context_matches_slicing(is_circular):
+    '''Patterns on both strands equal slicing then reverse complementing'''
+    bases = b'ACGTTGCAAGGCTTRN'
+    context = sequtils.SequenceContext(bases, is_circular)
+    assert context._reverse is None
+    for start in range(-2, len(bases) + 2):
+        for end in range(-2, len(bases) + 3):
+            if start < end:
+                forward = bases[start:end]
+            elif is_circular:
+                forward = bases[start:] + bases[:end]
+            else:
+                forward = b''
+            assert context.extract(start, end, 1) == forward
+            assert context.extract(start, end, -1) == \
+                sequtils.get_reverse_complement(forward)
+    assert context.reverse == sequtils.get_reverse_complement(bases)
+
+
+def test_sequence_context_of_packed_sequence():
+    from dgparse.packed import PackedSequence
+    context = sequtils.SequenceContext(PackedSequence(b'GATTACAN'), True)
+    assert context.extract(6, 2, -1) == b'TCNT'
+    assert context.extract(1, 4, 1) == b'ATT'
+
+
+def test_six_frame_translation():
+    frames = sequtils.six_frame_translation(b'ATGAAATAGnC')
+    assert frames[1, 0] == b'MK*'
+    assert frames[1, 1] == b'*NX'
+    assert frames[-1, 0] == sequtils.translate(
+        sequtils.get_reverse_complement(b'ATGAAATAGNC'))
+    for codon, amino_acid in sequtils.TRANSLATE.items():
+        assert sequtils.translate(codon.lower()) == amino_acid
+
+
+@pytest.mark.parametrize("bases,is_circular,orfs", [
+    (b'CCATGAAACCCTAGGG', False, [(2, 14, 1, 2)]),
+    (b'CCCTAGGGTTTCATGG', False, [(2, 14, -1, 2)]),
+    # nested start codons are part of the first ORF
+    (b'ATGATGTAAATG', False, [(0, 9, 1, 0)]),
+    # spans the origin only if the molecule is circular
+    (b'AAATAGCCCCATGCCC', True, [(10, 6, 1, 1)]),
+    (b'AAATAGCCCCATGCCC', False, []),
+])
+def test_find_orfs(bases, is_circular, orfs):
+    found = sequtils.find_orfs(bases, is_circular, min_length=6)
+    assert sorted((orf['start'], orf['end'], orf['strand'], orf['frame'])
+                  for orf in found) == orfs
+
+
+def circular_orfs(bases, min_length):
+    """Read on from every start codon around the circle, one turn at most"""
+    length = len(bases)
+    found = set()
+    for strand in (1, -1):
+        seq = bases if strand > 0 else sequtils.get_reverse_complement(bases)
+        turns = seq * 3
+        longest = {}  # by the position of the stop codon
+        for start in range(length):
+            if turns[start:start + 3] != b'ATG':
+                continue
+            for end in range(start + 3, start + length + 1, 3):
+                if sequtils.translate(turns[end - 3:end]) == b'*':
+                    if end - start > longest.get(end % length, (0, 0))[1]:
+                        longest[end % length] = (start, end - start)
+                    break
+        for start, size in longest.values():
+            if size < min_length:
+                continue
+            end = start + size
+            frame = start % 3
+            if strand < 0:
+                start, end = length - end, length - start
+            found.add((start % length, end % length or length, strand, frame))
+    return sorted(found)
+
+
+def test_find_orfs_circular_brute_force():
+    rand = random.Random(0)
+    cases = [b'ATGTATGGTTTAGTGTTATGGATTATTGATAAAAC',
+             b'CATACCAATACTAGTATACACCTCATATATA']
+    for _ in range(300):
+        cases.append(''.join(rand.choice('ACGT')
+                             for _ in range(rand.randint(3, 40))))
+    for bases in cases:
+        found = sequtils.find_orfs(bases, True, min_length=6)
+        assert sorted((orf['start'], orf['end'], orf['strand'], orf['frame'])
+                      for orf in found) == circular_orfs(bases, 6), bases
+
+
+def test_least_rotation():
+    rand = random.Random(0)
+    cases = [b'', b'A', b'GATTACA', b'CACACA', b'TTGCAATTGCA']
+    for _ in range(200):  # random, and near repeats, which tie for longest
+        bases = ''.join(rand.choice('ACGTN')
+                        for _ in range(rand.randint(0, 60)))
+        cases.append(bases)
+        cases.append((bases[:rand.randint(1, 5)] * 30)[:rand.randint(1, 80)])
+    for bases in cases:
+        rotations = [bases[i:] + bases[:i] for i in range(len(bases))]
+        start = sequtils.least_rotation(bases)
+        assert bases[start:] + bases[:start] == min(rotations or [b''])
+
+
+def test_canonical_sha1_ignores_origin_and_strand():
+    bases = b'GATTACAGGCCTTNAAGCT'
+    canonical = sequtils.canonical_sha1(bases)
+    for start in range(len(bases)):
+        rotated = bases[start:] + bases[:start]
+        assert sequtils.canonical_sha1(rotated) == canonical
+        assert sequtils.canonical_sha1(
+            sequtils.get_reverse_complement(rotated).lower()) == canonical
+    assert sequtils.canonical_sha1(bases[1:]) != canonical
@@ -142,3 +142,118 @@ def testNotesMissing(utils):
     with utils.fixture_data("testdata/test_no6.dna") as f:
         noNotes = parse_snapgene(f)
     assert noNotes["notes"] is None
+
+
+"""Test decoding only the requested segments from the segment index"""
+def testSegmentIndex(utils):
+    from dgparse.snapgene.main import index_segments
+    with utils.fixture_data("testdata/pDONR223 empty vector.dna") as f:
+        data = f.read()
+    index = index_segments(data)
+    assert index[0] == (9, 5, 14)
+    assert [entry.type for entry in index].count(0) == 1
+    dna = [entry for entry in index if entry.type == 0][0]
+    assert dna.length == 5006
+    assert index[-1].offset + index[-1].length == len(data)
+
+
+def testRequestedSegments(utils, parsed):
+    import io
+    with utils.fixture_data("testdata/pDONR223 empty vector.dna") as f:
+        only_dna = parse_snapgene(f, segments=('DNA',))
+        f.seek(0)
+        from_memory = parse_snapgene(io.BytesIO(f.read()), ('DNA', 'features'))
+    assert only_dna["DNA"] == parsed["DNA"]
+    assert only_dna["features"] is None and only_dna["descriptor"] is None
+    assert from_memory["features"] == parsed["features"]
+    with pytest.raises(ValueError):
+        parse_snapgene(io.BytesIO(), segments=('history',))
+
+
+def testCurrentOffset(utils, parsed, tmpdir):
+    """Parsing starts where the open file is, as it did with read()"""
+    with utils.fixture_data("testdata/pDONR223 empty vector.dna") as f:
+        data = f.read()
+    path = tmpdir.join('prefixed.dna')
+    path.write(b'skipped' + data, mode='wb')
+    with open(str(path), 'rb') as f:
+        f.seek(len(b'skipped'))
+        assert parse_snapgene(f)["DNA"] == parsed["DNA"]
+
+
+def testLoadGzipped(utils, tmpdir):
+    """A gzipped .dna is read rather than mapped, and parses the same"""
+    import gzip
+    import dgparse
+    with utils.fixture_data("testdata/pDONR223 empty vector.dna") as f:
+        data = f.read()
+    plain = tmpdir.join('vector.dna')
+    plain.write(data, mode='wb')
+    packed = str(tmpdir.join('vector.dna.gz'))
+    with gzip.open(packed, 'wb') as out:
+        out.write(data)
+    loaded = []
+    for path in str(plain), packed:
+        molecule, _ = next(dgparse.load_iter('dnamolecule', [path]))
+        loaded.append((molecule['sequence'], molecule['length'],
+                       molecule['is_circular']))
+    assert loaded[0][0]['bases']
+    assert loaded[1] == loaded[0]
+
+
+def testParseFeaturesXml():
+    from dgparse.snapgene.segments import parse_features
+    xml = (b'<Features><Feature name="lac" directionality="2" type="promoter" '
+           b'unknownAttribute="x"><Segment range="2-40" color="#fff"/>'
+           b'<Q name="note"><V text="lac promoter"/></Q></Feature>'
+           b'<Feature name="ori" readingFrame="-1"/></Features>')
+    assert parse_features(xml) == [
+        {'name': 'lac', 'directionality': 2, 'type': 'promoter',
+         'Segment': {'range': '2-40', 'color': '#fff'},
+         'Notes': {'note': 'lac promoter'}},
+        {'name': 'ori', 'readingFrame': -1, 'Notes': {}},
+    ]
+
+
+"""Test the snapgene-json batch converter"""
+def testBatchConversion(tmpdir):
+    import json
+    from dgparse.snapgene.main import main
+    testdata = os.path.join(os.path.dirname(__file__), 'testdata')
+    output = tmpdir.join('out.ndjson')
+    status = main([testdata, os.path.join(testdata, 'test_no1*.dna'),
+                   '--workers', '2', '--output', str(output)])
+    assert status == 1  # some test files are broken on purpose
+    lines = [json.loads(line) for line in output.readlines()]
+    converted = sorted(os.path.basename(line['file']) for line in lines)
+    assert converted == ['pDONR223 empty vector.dna', 'test_no10.dna',
+                         'test_no5.dna', 'test_no6.dna', 'test_no8.dna']
+    assert all(line['snapgene']['DNA']['sequence'] for line in lines)
+
+    out_dir = tmpdir.join('json')
+    status = main([os.path.join(testdata, 'test_no[58].dna'),
+                   '--workers', '1', '--output-dir', str(out_dir)])
+    assert status == 0
+    assert sorted(out_dir.listdir()) == [out_dir.join('test_no5.json'),
+                                         out_dir.join('test_no8.json')]
+
+
+def testOutputDirKeepsLayout(tmpdir):
+    import shutil
+    from dgparse.snapgene.main import main, output_names
+    source = os.path.join(os.path.dirname(__file__), 'testdata',
+                          'test_no5.dna')
+    inputs = tmpdir.mkdir('in')
+    for folder in ('a', 'b'):
+        shutil.copy(source, str(inputs.mkdir(folder).join('x.dna')))
+    shutil.copy(source, str(inputs.join('a', 'x.DNA')))
+    out_dir = tmpdir.join('json')
+    status = main([str(inputs), '--workers', '1',
+                   '--output-dir', str(out_dir)])
+    # x.dna and x.DNA in a/ both map to a/x.json, the second is a failure
+    assert status == 1
+    assert out_dir.join('a', 'x.json').check()
+    assert out_dir.join('b', 'x.json').check()
+    assert output_names(['a/x.dna', 'b/y/x.dna']) == {
+        'a/x.dna': os.path.join('a', 'x.json'),
+        'b/y/x.dna': os.path.join('b', 'y', 'x.json')}